@@ -1,21 +1,145 @@
 
 import math
-import random
+import mmap
+import os
+import sys
+import time
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Default board size and number in a row needed to win
+ROWS = 3
+COLS = 3
+WIN_LENGTH = 3
 
-def initial_state():
+# Boards with at most this many cells are solved exactly; larger boards use
+# iterative deepening with MOVE_BUDGET seconds per move
+EXACT_CELLS = 9
+MOVE_BUDGET = 1.0
+
+
+def line_masks(rows, cols, k):
+    """
+    Returns a tuple with one bitmask for every run of `k` cells in a row,
+    column or diagonal of a `rows` x `cols` grid. Cell (i, j) is bit i * cols + j.
+    """
+    masks = []
+    for i in range(rows):
+        for j in range(cols):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_i = i + di * (k - 1)
+                end_j = j + dj * (k - 1)
+                if not (0 <= end_i < rows and 0 <= end_j < cols):
+                    continue
+                mask = 0
+                for step in range(k):
+                    mask |= 1 << ((i + di * step) * cols + (j + dj * step))
+                masks.append(mask)
+    return tuple(masks)
+
+
+def symmetries(rows, cols):
+    """
+    Returns the cell permutations for every symmetry of a `rows` x `cols` grid:
+    8 rotations and reflections on a square grid, 4 otherwise.
+    """
+    maps = [
+        lambda i, j: (i, j),
+        lambda i, j: (i, cols - 1 - j),
+        lambda i, j: (rows - 1 - i, j),
+        lambda i, j: (rows - 1 - i, cols - 1 - j),
+    ]
+    if rows == cols:
+        maps += [
+            lambda i, j: (j, i),
+            lambda i, j: (j, rows - 1 - i),
+            lambda i, j: (cols - 1 - j, i),
+            lambda i, j: (cols - 1 - j, rows - 1 - i),
+        ]
+    perms = []
+    for transform in maps:
+        perm = []
+        for cell in range(rows * cols):
+            i, j = transform(cell // cols, cell % cols)
+            perm.append(i * cols + j)
+        perms.append(tuple(perm))
+    return perms
+
+
+class Game():
+    """
+    Geometry of an m x n board won by k in a row, plus the
+    transposition tables shared by every search on that geometry.
+    """
+
+    def __init__(self, rows=ROWS, cols=COLS, k=WIN_LENGTH):
+        if not 1 <= k <= max(rows, cols):
+            raise ValueError(f"Cannot get {k} in a row on a {rows}x{cols} board")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = rows * cols
+        self.full_mask = (1 << self.cells) - 1
+        self.win_masks = line_masks(rows, cols, k)
+
+        # Depth-limited search scores a win above any heuristic() value,
+        # which is at most 10 ** (k - 1) for each line
+        self.win_score = len(self.win_masks) * 10 ** k
+
+        # Lines through each cell, so a move only checks the lines it touches
+        self.cell_masks = tuple(
+            tuple(mask for mask in self.win_masks if mask >> cell & 1)
+            for cell in range(self.cells)
+        )
+
+        # Cells on the most lines first: a cheap static move ordering
+        self.move_order = tuple(sorted(
+            range(self.cells), key=lambda cell: -len(self.cell_masks[cell])
+        ))
+        self.symmetries = symmetries(rows, cols)
+
+        # Exact search: canonical key -> (value, flag)
+        self.table = {}
+
+        # Depth-limited search: raw key -> (depth, value, flag, best cell),
+        # for the current root move only
+        self.deepening_table = {}
+
+
+_games = {}
+
+
+def game_for(rows=ROWS, cols=COLS, k=WIN_LENGTH):
+    """
+    Returns the shared Game for a board size and win length.
+    """
+    key = (rows, cols, k)
+    if key not in _games:
+        _games[key] = Game(rows, cols, k)
+    return _games[key]
+
+
+def board_game(board, k=WIN_LENGTH):
+    """
+    Returns the Game matching the dimensions of a list-of-lists board.
+    """
+    return game_for(len(board), len(board[0]), k)
+
+
+STANDARD = game_for()
+CELLS = STANDARD.cells
+FULL_MASK = STANDARD.full_mask
+WIN_MASKS = STANDARD.win_masks
+
+
+def initial_state(rows=ROWS, cols=COLS):
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, X, EMPTY],
-            [EMPTY, X, EMPTY],
-            [EMPTY, X, EMPTY]]
+    return [[EMPTY] * cols for _ in range(rows)]
 
-board = initial_state()
 
 def player(board):
     """
@@ -24,59 +148,537 @@ def player(board):
     empty_spaces = sum(row.count(EMPTY) for row in board)
     if empty_spaces == 0:
         return "Game Finish"
+    return bit_player(*to_bitboard(board))
 
 
-    else:
-        players = [X,O]
-        return random.choice(players)
-
-current_player = player(board)
-
-print(current_player)
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    actions_set = set()
-   
+    game = board_game(board)
+    x_bits, o_bits = to_bitboard(board)
+    return {divmod(cell, game.cols) for cell in bit_actions(x_bits, o_bits, game)}
 
-    for i in range(len(board)):
-        for j in range(len(board[i])):
-            actions_set.add((i,j))
-            if isinstance(board[i][j], str):
-                actions_set.discard((i,j))
-    return actions_set
-
-def result(board, action):
+def result(board, action, k=WIN_LENGTH):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    raise NotImplementedError
+    game = board_game(board, k)
+    i, j = action
+    if not (0 <= i < game.rows and 0 <= j < game.cols):
+        raise ValueError(f"Invalid action {action}")
+    x_bits, o_bits = to_bitboard(board)
+    return from_bitboard(*bit_result(x_bits, o_bits, i * game.cols + j, game), game)
 
 
-def winner(board):
+def winner(board, k=WIN_LENGTH):
     """
     Returns the winner of the game, if there is one.
     """
-    raise NotImplementedError
+    return bit_winner(*to_bitboard(board), board_game(board, k))
 
 
-def terminal(board):
+def terminal(board, k=WIN_LENGTH):
     """
     Returns True if game is over, False otherwise.
     """
-    raise NotImplementedError
+    return bit_terminal(*to_bitboard(board), board_game(board, k))
 
 
-def utility(board):
+def utility(board, k=WIN_LENGTH):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    raise NotImplementedError
+    return bit_utility(*to_bitboard(board), board_game(board, k))
 
 
-def minimax(board):
+def minimax(board, k=WIN_LENGTH, budget=MOVE_BUDGET, use_book=True):
     """
     Returns the optimal action for the current player on the board.
+
+    Boards of up to EXACT_CELLS cells are solved exactly (from the opening
+    book when `use_book` is set and one is available for the 3x3 game).
+    Larger boards return the best move found by iterative deepening within
+    `budget` seconds.
+    """
+    game = board_game(board, k)
+    x_bits, o_bits = to_bitboard(board)
+    if bit_terminal(x_bits, o_bits, game):
+        return None
+
+    if game is STANDARD and use_book:
+        book = opening_book()
+        if book is not None:
+            cell, _ = book_lookup(book, x_bits, o_bits)
+            return divmod(cell, game.cols)
+    if game.cells <= EXACT_CELLS:
+        return divmod(search_move(x_bits, o_bits, game), game.cols)
+    return divmod(deepening_move(x_bits, o_bits, game, budget), game.cols)
+
+
+def search_move(x_bits, o_bits, game=STANDARD):
+    """
+    Returns the best cell for the player to move, found by alpha-beta search.
+    """
+    maximizing = bit_player(x_bits, o_bits) == X
+    alpha = -math.inf
+    beta = math.inf
+    best_cell = None
+    for cell in bit_actions(x_bits, o_bits, game):
+        value = _alphabeta(*bit_result(x_bits, o_bits, cell, game), alpha, beta, game)
+        if maximizing and value > alpha:
+            alpha = value
+            best_cell = cell
+        elif not maximizing and value < beta:
+            beta = value
+            best_cell = cell
+    return best_cell
+
+
+# Bitboard representation: one integer per player, bit i * cols + j set
+# when that player owns cell (i, j). The functions below are the fast path
+# used by search; the list-of-lists functions above convert and delegate.
+
+def to_bitboard(board):
+    """
+    Returns the pair (x_bits, o_bits) for a list-of-lists board.
+    """
+    cols = len(board[0])
+    x_bits = 0
+    o_bits = 0
+    for i, row in enumerate(board):
+        for j, value in enumerate(row):
+            if value == X:
+                x_bits |= 1 << (i * cols + j)
+            elif value == O:
+                o_bits |= 1 << (i * cols + j)
+    return x_bits, o_bits
+
+
+def from_bitboard(x_bits, o_bits, game=STANDARD):
+    """
+    Returns the list-of-lists board for the pair (x_bits, o_bits).
+    """
+    board = initial_state(game.rows, game.cols)
+    for cell in range(game.cells):
+        if x_bits >> cell & 1:
+            board[cell // game.cols][cell % game.cols] = X
+        elif o_bits >> cell & 1:
+            board[cell // game.cols][cell % game.cols] = O
+    return board
+
+
+def bit_player(x_bits, o_bits):
+    """
+    Returns the player to move; X always moves first.
+    """
+    return X if x_bits.bit_count() == o_bits.bit_count() else O
+
+
+def bit_actions(x_bits, o_bits, game=STANDARD):
+    """
+    Returns a list of the free cell indices, lowest first.
+    """
+    free = game.full_mask & ~(x_bits | o_bits)
+    cells = []
+    while free:
+        low = free & -free
+        cells.append(low.bit_length() - 1)
+        free ^= low
+    return cells
+
+
+def bit_result(x_bits, o_bits, cell, game=STANDARD):
+    """
+    Returns the (x_bits, o_bits) pair after the player to move takes `cell`.
+    """
+    bit = 1 << cell
+    if not 0 <= cell < game.cells or (x_bits | o_bits) & bit:
+        raise ValueError(f"Invalid action {divmod(cell, game.cols)}")
+    if bit_player(x_bits, o_bits) == X:
+        return x_bits | bit, o_bits
+    return x_bits, o_bits | bit
+
+
+def bit_winner(x_bits, o_bits, game=STANDARD):
+    """
+    Returns X or O if that player owns a complete line, None otherwise.
+    """
+    for mask in game.win_masks:
+        if x_bits & mask == mask:
+            return X
+        if o_bits & mask == mask:
+            return O
+    return None
+
+
+def bit_terminal(x_bits, o_bits, game=STANDARD):
+    """
+    Returns True if someone has won or the board is full.
+    """
+    return ((x_bits | o_bits) == game.full_mask or
+            bit_winner(x_bits, o_bits, game) is not None)
+
+
+def bit_utility(x_bits, o_bits, game=STANDARD):
+    """
+    Returns 1 if X has won, -1 if O has won, 0 otherwise.
+    """
+    win = bit_winner(x_bits, o_bits, game)
+    return 1 if win == X else -1 if win == O else 0
+
+
+# Exact search. Each Game keeps a transposition table shared by every
+# minimax() call, keyed on the canonical hash of a position so that all
+# rotations/reflections share one entry. Entries are (value, flag) where
+# flag says whether value is exact or only a lower/upper bound left behind
+# by an alpha-beta cutoff.
+EXACT = 0
+LOWER = 1
+UPPER = 2
+
+TRANSPOSITION_TABLE = STANDARD.table
+SYMMETRIES = STANDARD.symmetries
+STATS = {"nodes": 0, "probes": 0, "hits": 0}
+
+
+def permute(bits, perm):
+    """
+    Returns `bits` with every set cell moved to perm[cell].
+    """
+    out = 0
+    while bits:
+        low = bits & -bits
+        out |= 1 << perm[low.bit_length() - 1]
+        bits ^= low
+    return out
+
+
+def canonical_key(x_bits, o_bits, game=STANDARD):
+    """
+    Returns the smallest hash of the position over all board symmetries.
+    """
+    return min(
+        permute(x_bits, perm) << game.cells | permute(o_bits, perm)
+        for perm in game.symmetries
+    )
+
+
+def _alphabeta(x_bits, o_bits, alpha, beta, game=STANDARD):
+    """
+    Returns the minimax value (from X's point of view) of a position,
+    searching inside the window (alpha, beta).
+    """
+    STATS["nodes"] += 1
+    if bit_terminal(x_bits, o_bits, game):
+        return bit_utility(x_bits, o_bits, game)
+
+    key = canonical_key(x_bits, o_bits, game)
+    STATS["probes"] += 1
+    entry = game.table.get(key)
+    if entry is not None:
+        value, flag = entry
+        if (flag == EXACT or
+                (flag == LOWER and value >= beta) or
+                (flag == UPPER and value <= alpha)):
+            STATS["hits"] += 1
+            return value
+
+    start_alpha = alpha
+    start_beta = beta
+    maximizing = bit_player(x_bits, o_bits) == X
+    best = -math.inf if maximizing else math.inf
+    for cell in bit_actions(x_bits, o_bits, game):
+        value = _alphabeta(*bit_result(x_bits, o_bits, cell, game), alpha, beta, game)
+        if maximizing:
+            best = max(best, value)
+            alpha = max(alpha, best)
+        else:
+            best = min(best, value)
+            beta = min(beta, best)
+        if alpha >= beta:
+            break
+
+    if best <= start_alpha:
+        flag = UPPER
+    elif best >= start_beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    game.table[key] = (best, flag)
+    return best
+
+
+# Depth-limited search for boards too large to solve. Leaves are scored by
+# heuristic(); wins score +/- game.win_score. Each iteration stores its best move
+# per position so the next, deeper iteration searches that move first.
+
+class SearchTimeout(Exception):
+    """
+    Raised inside the search when the move's time budget runs out.
+    """
+
+
+def heuristic(x_bits, o_bits, game=STANDARD):
+    """
+    Returns a score from X's point of view: every line still open to only
+    one player counts for that player, weighted by how full it is.
+    """
+    score = 0
+    for mask in game.win_masks:
+        x_line = x_bits & mask
+        o_line = o_bits & mask
+        if x_line and not o_line:
+            score += 10 ** x_line.bit_count()
+        elif o_line and not x_line:
+            score -= 10 ** o_line.bit_count()
+    return score
+
+
+def deepening_move(x_bits, o_bits, game, budget=MOVE_BUDGET):
+    """
+    Returns the best cell found by iterative-deepening alpha-beta search
+    before `budget` seconds have passed. The result of the deepest
+    completed iteration is used.
+
+    The table starts empty for each move, so it stays bounded over a long
+    run and no entry is deeper than the current iteration: a win found at
+    some depth is the shortest one.
+    """
+    game.deepening_table.clear()
+    deadline = time.perf_counter() + budget
+    free = set(bit_actions(x_bits, o_bits, game))
+    moves = [cell for cell in game.move_order if cell in free]
+    maximizing = bit_player(x_bits, o_bits) == X
+    best_cell = moves[0]
+
+    for depth in range(1, len(moves) + 1):
+        try:
+            scores = {}
+            alpha = -math.inf
+            beta = math.inf
+            for cell in moves:
+                child = bit_result(x_bits, o_bits, cell, game)
+                value = _deepen(*child, depth - 1, alpha, beta, cell, game, deadline)
+                scores[cell] = value
+                if maximizing and value > alpha:
+                    alpha = value
+                elif not maximizing and value < beta:
+                    beta = value
+        except SearchTimeout:
+            break
+
+        # Search this iteration's best moves first on the next one
+        moves.sort(key=lambda cell: scores[cell], reverse=maximizing)
+        best_cell = moves[0]
+        if abs(scores[best_cell]) >= game.win_score:
+            break
+    return best_cell
+
+
+def _deepen(x_bits, o_bits, depth, alpha, beta, last_cell, game, deadline):
+    """
+    Returns the depth-limited minimax value of a position reached by
+    playing `last_cell`, raising SearchTimeout once `deadline` passes.
+    """
+    STATS["nodes"] += 1
+    if STATS["nodes"] & 1023 == 0 and time.perf_counter() > deadline:
+        raise SearchTimeout
+
+    maximizing = bit_player(x_bits, o_bits) == X
+    mover_bits = o_bits if maximizing else x_bits
+    for mask in game.cell_masks[last_cell]:
+        if mover_bits & mask == mask:
+            return -game.win_score if maximizing else game.win_score
+    if (x_bits | o_bits) == game.full_mask:
+        return 0
+    if depth == 0:
+        return heuristic(x_bits, o_bits, game)
+
+    key = x_bits << game.cells | o_bits
+    STATS["probes"] += 1
+    entry = game.deepening_table.get(key)
+    hint = None
+    if entry is not None:
+        entry_depth, value, flag, hint = entry
+        if entry_depth >= depth and (
+                flag == EXACT or
+                (flag == LOWER and value >= beta) or
+                (flag == UPPER and value <= alpha)):
+            STATS["hits"] += 1
+            return value
+
+    free = game.full_mask & ~(x_bits | o_bits)
+    moves = [cell for cell in game.move_order if free >> cell & 1]
+    if hint is not None:
+        moves.remove(hint)
+        moves.insert(0, hint)
+
+    start_alpha = alpha
+    start_beta = beta
+    best = -math.inf if maximizing else math.inf
+    best_cell = moves[0]
+    for cell in moves:
+        child = bit_result(x_bits, o_bits, cell, game)
+        value = _deepen(*child, depth - 1, alpha, beta, cell, game, deadline)
+        if maximizing and value > best:
+            best = value
+            best_cell = cell
+            alpha = max(alpha, best)
+        elif not maximizing and value < best:
+            best = value
+            best_cell = cell
+            beta = min(beta, best)
+        if alpha >= beta:
+            break
+
+    if best <= start_alpha:
+        flag = UPPER
+    elif best >= start_beta:
+        flag = LOWER
+    else:
+        flag = EXACT
+    game.deepening_table[key] = (depth, best, flag, best_cell)
+    return best
+
+
+def search_stats():
+    """
+    Returns node, probe and hit counts of the search so far, plus the
+    table hit rate and size.
+    """
+    probes = STATS["probes"]
+    return {
+        **STATS,
+        "hit_rate": STATS["hits"] / probes if probes else 0.0,
+        "table_size": sum(len(game.table) + len(game.deepening_table)
+                          for game in _games.values()),
+    }
+
+
+def reset_search(clear_table=False):
+    """
+    Zeroes the search counters, and optionally empties the transposition tables.
+    """
+    for counter in STATS:
+        STATS[counter] = 0
+    if clear_table:
+        for game in _games.values():
+            game.table.clear()
+            game.deepening_table.clear()
+
+
+def plain_minimax_nodes(board, k=WIN_LENGTH):
+    """
+    Returns the number of nodes a full-tree minimax without pruning or
+    table would visit from `board`, as a baseline for search_stats().
+    """
+    game = board_game(board, k)
+
+    def count(x_bits, o_bits):
+        if bit_terminal(x_bits, o_bits, game):
+            return 1
+        return 1 + sum(
+            count(*bit_result(x_bits, o_bits, cell, game))
+            for cell in bit_actions(x_bits, o_bits, game)
+        )
+    return count(*to_bitboard(board))
+
+
+# Opening book: the solved 3x3 game, one byte per position, indexed by the
+# base-3 encoding of the board (0 empty, 1 X, 2 O per cell). The low nibble
+# holds the best cell (NO_MOVE on terminal boards) and bits 4-5 hold the
+# value + 1. Positions that cannot be reached are UNREACHABLE.
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tictactoe.book")
+BOOK_MAGIC = b"TTT1"
+BOOK_SIZE = 3 ** CELLS
+NO_MOVE = 0x0F
+UNREACHABLE = 0xFF
+
+_book = None
+_book_checked = False
+
+
+def book_index(x_bits, o_bits):
+    """
+    Returns the base-3 index of a position in the opening book.
     """
-    raise NotImplementedError
+    index = 0
+    for cell in range(CELLS - 1, -1, -1):
+        index = index * 3 + (x_bits >> cell & 1) + 2 * (o_bits >> cell & 1)
+    return index
+
+
+def build_book(filename=BOOK_FILE):
+    """
+    Solves every reachable position and writes the opening book to `filename`.
+    Returns the number of positions written.
+    """
+    table = bytearray([UNREACHABLE]) * BOOK_SIZE
+    stack = [(0, 0)]
+    while stack:
+        x_bits, o_bits = stack.pop()
+        index = book_index(x_bits, o_bits)
+        if table[index] != UNREACHABLE:
+            continue
+        if bit_terminal(x_bits, o_bits):
+            table[index] = (bit_utility(x_bits, o_bits) + 1) << 4 | NO_MOVE
+            continue
+        cell = search_move(x_bits, o_bits)
+        value = _alphabeta(*bit_result(x_bits, o_bits, cell), -math.inf, math.inf)
+        table[index] = (value + 1) << 4 | cell
+        for action in bit_actions(x_bits, o_bits):
+            stack.append(bit_result(x_bits, o_bits, action))
+
+    with open(filename, "wb") as f:
+        f.write(BOOK_MAGIC)
+        f.write(table)
+
+    # Let opening_book() pick up the new file
+    global _book, _book_checked
+    _book = None
+    _book_checked = False
+    return BOOK_SIZE - table.count(UNREACHABLE)
+
+
+def load_book(filename=BOOK_FILE):
+    """
+    Memory-maps the opening book in `filename` and returns it.
+    """
+    with open(filename, "rb") as f:
+        book = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    if book[:len(BOOK_MAGIC)] != BOOK_MAGIC or len(book) != len(BOOK_MAGIC) + BOOK_SIZE:
+        book.close()
+        raise ValueError(f"{filename} is not a {ROWS}x{COLS} opening book")
+    return book
+
+
+def opening_book():
+    """
+    Returns the default opening book, loading it on first use,
+    or None if it has not been built.
+    """
+    global _book, _book_checked
+    if not _book_checked:
+        _book_checked = True
+        if os.path.exists(BOOK_FILE):
+            _book = load_book(BOOK_FILE)
+    return _book
+
+
+def book_lookup(book, x_bits, o_bits):
+    """
+    Returns (cell, value) for a position; cell is None on terminal boards.
+    """
+    entry = book[len(BOOK_MAGIC) + book_index(x_bits, o_bits)]
+    if entry == UNREACHABLE:
+        raise ValueError("Position is not reachable in a legal game")
+    cell = entry & 0x0F
+    return (None if cell == NO_MOVE else cell), (entry >> 4) - 1
+
+
+if __name__ == "__main__":
+    if sys.argv[1:] != ["build-book"]:
+        sys.exit("Usage: python tictactoe.py build-book")
+    count = build_book()
+    print(f"Wrote {count} positions to {BOOK_FILE}")
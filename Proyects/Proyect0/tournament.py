@@ -0,0 +1,178 @@
+import argparse
+import json
+import multiprocessing
+import random
+import sys
+import time
+
+import tictactoe as ttt
+
+# Games handed to a worker process at a time
+BATCH_SIZE = 50
+
+# Search tables are emptied before every game, so a worker's memory stays
+# flat over a long run and each game's latencies do not depend on which
+# games the worker happened to play before it
+CLEAR_TABLES = "each game"
+
+
+def random_agent(board, k, rng):
+    """
+    Plays a uniformly random legal move.
+    """
+    return rng.choice(sorted(ttt.actions(board)))
+
+
+def minimax_agent(board, k, rng):
+    """
+    Plays the move found by search, without the opening book.
+    """
+    return ttt.minimax(board, k, use_book=False)
+
+
+def book_agent(board, k, rng):
+    """
+    Plays the move stored in the opening book (3x3 only).
+    """
+    book = ttt.opening_book()
+    if book is None:
+        raise RuntimeError("Opening book not built; run: python tictactoe.py build-book")
+    cell, _ = ttt.book_lookup(book, *ttt.to_bitboard(board))
+    return divmod(cell, ttt.COLS)
+
+
+AGENTS = {
+    "random": random_agent,
+    "minimax": minimax_agent,
+    "book": book_agent,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Play tic-tac-toe agents against each other.")
+    parser.add_argument("first", choices=AGENTS)
+    parser.add_argument("second", choices=AGENTS)
+    parser.add_argument("-n", "--games", type=int, default=1000)
+    parser.add_argument("--rows", type=int, default=ttt.ROWS)
+    parser.add_argument("--cols", type=int, default=ttt.COLS)
+    parser.add_argument("-k", type=int, default=ttt.WIN_LENGTH)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("-o", "--output", help="write JSON stats here instead of stdout")
+    args = parser.parse_args()
+
+    if "book" in (args.first, args.second):
+        if (args.rows, args.cols, args.k) != (ttt.ROWS, ttt.COLS, ttt.WIN_LENGTH):
+            sys.exit("The book agent only plays the 3x3 game")
+        if ttt.opening_book() is None:
+            ttt.build_book()
+
+    stats = run_tournament(
+        args.first, args.second, args.games,
+        args.rows, args.cols, args.k, args.seed, args.processes
+    )
+    text = json.dumps(stats, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def run_tournament(first, second, games, rows=ttt.ROWS, cols=ttt.COLS,
+                   k=ttt.WIN_LENGTH, seed=0, processes=None):
+    """
+    Plays `games` games between agents `first` and `second` across a process
+    pool, alternating who plays X, and returns the aggregate stats.
+    """
+    batches = [
+        (first, second, start, min(BATCH_SIZE, games - start), rows, cols, k, seed)
+        for start in range(0, games, BATCH_SIZE)
+    ]
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(play_batch, batches)
+
+    outcomes = {"win": 0, "draw": 0, "loss": 0}
+    latencies = {first: [], second: []}
+    for batch_outcomes, batch_latencies in results:
+        for outcome in outcomes:
+            outcomes[outcome] += batch_outcomes[outcome]
+        for name in latencies:
+            latencies[name].extend(batch_latencies[name])
+
+    return {
+        "first": first,
+        "second": second,
+        "board": {"rows": rows, "cols": cols, "k": k},
+        "games": games,
+        "seed": seed,
+        "tables_cleared": CLEAR_TABLES,
+        # Outcomes from the first agent's point of view
+        **outcomes,
+        "latency_ms": {
+            name: percentiles(times) for name, times in latencies.items()
+        },
+    }
+
+
+def play_batch(batch):
+    """
+    Plays one batch of games in a worker. Game i uses its own seeded RNG, and
+    the first agent plays X in even-numbered games. Returns the outcome
+    counts and per-agent move latencies in seconds.
+    """
+    first, second, start, count, rows, cols, k, seed = batch
+    outcomes = {"win": 0, "draw": 0, "loss": 0}
+    latencies = {first: [], second: []}
+    for index in range(start, start + count):
+        rng = random.Random(seed * 1_000_003 + index)
+        x_name, o_name = (first, second) if index % 2 == 0 else (second, first)
+        score, times = play_game(x_name, o_name, rows, cols, k, rng)
+        if x_name != first:
+            score = -score
+        outcomes["win" if score > 0 else "loss" if score < 0 else "draw"] += 1
+        latencies[x_name].extend(times[ttt.X])
+        latencies[o_name].extend(times[ttt.O])
+    return outcomes, latencies
+
+
+def play_game(x_name, o_name, rows, cols, k, rng):
+    """
+    Plays one game, starting from empty search tables, and returns the
+    utility for X along with the time taken by each move, keyed by player.
+    """
+    ttt.reset_search(clear_table=True)
+    agents = {ttt.X: AGENTS[x_name], ttt.O: AGENTS[o_name]}
+    times = {ttt.X: [], ttt.O: []}
+    board = ttt.initial_state(rows, cols)
+    while not ttt.terminal(board, k):
+        turn = ttt.player(board)
+        start = time.perf_counter()
+        action = agents[turn](board, k, rng)
+        times[turn].append(time.perf_counter() - start)
+        board = ttt.result(board, action, k)
+    return ttt.utility(board, k), times
+
+
+def percentiles(times):
+    """
+    Returns the mean and p50/p90/p99 of a list of latencies, in milliseconds.
+    """
+    if not times:
+        return {}
+    times = sorted(times)
+
+    def at(fraction):
+        return 1000 * times[min(len(times) - 1, int(fraction * len(times)))]
+
+    return {
+        "moves": len(times),
+        "mean": 1000 * sum(times) / len(times),
+        "p50": at(0.50),
+        "p90": at(0.90),
+        "p99": at(0.99),
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+import argparse
+import json
+import multiprocessing
+import random
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+# (height, width, mines)
+PRESETS = {
+    "beginner": (9, 9, 10),
+    "intermediate": (16, 16, 40),
+    "expert": (16, 30, 99),
+}
+
+# Knowledge-base sizes are reported as the mean over games at each of
+# this many evenly spaced points through a game
+SIZE_POINTS = 10
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark MinesweeperAI on seeded games.")
+    parser.add_argument("presets", nargs="*", default=list(PRESETS),
+                        help=f"any of {', '.join(PRESETS)}, or HEIGHTxWIDTHxMINES")
+    parser.add_argument("-n", "--games", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--guess", choices=["probability", "uniform"], default="probability")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--label", default=None, help="version label stored with the results")
+    parser.add_argument("-o", "--output", help="write JSON results here instead of stdout")
+    args = parser.parse_args()
+
+    sizes = {name: parse_preset(name) for name in args.presets}
+    results = {
+        "label": args.label,
+        "games": args.games,
+        "seed": args.seed,
+        "guess": args.guess,
+        "presets": {},
+    }
+    with multiprocessing.Pool(args.processes) as pool:
+        for name, size in sizes.items():
+            results["presets"][name] = run_preset(
+                pool, size, args.games, args.seed, args.guess
+            )
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+def parse_preset(name):
+    """
+    Returns (height, width, mines) for a preset name or a HEIGHTxWIDTHxMINES string.
+    """
+    if name in PRESETS:
+        return PRESETS[name]
+    try:
+        height, width, mines = (int(part) for part in name.lower().split("x"))
+    except ValueError:
+        raise SystemExit(f"Unknown preset {name!r}")
+    return height, width, mines
+
+
+def run_preset(pool, size, games, seed, guess):
+    """
+    Plays `games` seeded games of one board size on the pool and returns
+    the aggregate stats.
+    """
+    height, width, mines = size
+    jobs = [(height, width, mines, seed + game, guess) for game in range(games)]
+    records = pool.map(play_game, jobs)
+
+    latencies = sorted(t for record in records for t in record["latencies"])
+    sizes = [record["knowledge"] for record in records if record["knowledge"]]
+    return {
+        "height": height,
+        "width": width,
+        "mines": mines,
+        "win_rate": sum(record["won"] for record in records) / games,
+        "guesses": {
+            "mean": sum(record["guesses"] for record in records) / games,
+            "max": max(record["guesses"] for record in records),
+        },
+        "add_knowledge_ms": {
+            "calls": len(latencies),
+            "mean": 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            "p99": 1000 * percentile(latencies, 0.99),
+        },
+        "knowledge_size": {
+            "max": max((max(record) for record in sizes), default=0),
+            "over_game": [
+                sum(record[min(len(record) - 1, point * len(record) // SIZE_POINTS)]
+                    for record in sizes) / len(sizes) if sizes else 0.0
+                for point in range(SIZE_POINTS)
+            ],
+        },
+    }
+
+
+def play_game(job):
+    """
+    Plays one game with the AI and returns whether it won, how many moves
+    were guesses, the time of each add_knowledge() call and the size of
+    the knowledge base after each one.
+    """
+    height, width, mines, seed, guess = job
+    random.seed(seed)
+    game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width, mines=mines, guess=guess)
+
+    record = {"won": False, "guesses": 0, "latencies": [], "knowledge": []}
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+            if move is None:
+                record["won"] = ai.mines == game.mines
+                return record
+            record["guesses"] += 1
+        if game.is_mine(move):
+            return record
+
+        start = time.perf_counter()
+        ai.add_knowledge(move, game.nearby_mines(move))
+        record["latencies"].append(time.perf_counter() - start)
+        record["knowledge"].append(len(ai.knowledge))
+
+
+def percentile(values, fraction):
+    """
+    Returns the value at `fraction` of a sorted list, or 0 if it is empty.
+    """
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+if __name__ == "__main__":
+    main()
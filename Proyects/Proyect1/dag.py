@@ -0,0 +1,245 @@
+import itertools
+import weakref
+
+from logic import And, Biconditional, Implication, Not, Or, Sentence, Symbol
+
+# Node kinds
+TRUE = "true"
+FALSE = "false"
+SYMBOL = "symbol"
+NOT = "not"
+AND = "and"
+OR = "or"
+IFF = "iff"
+
+
+class Node(Sentence):
+    """
+    Logical sentence stored as a node of a shared DAG. Nodes are interned:
+    building a structurally identical formula twice returns the same node,
+    so repeated subformulas are stored and evaluated once. Nodes are made
+    by the functions below, never directly, and are simplified as they are
+    built: constants fold away, nested conjunctions and disjunctions are
+    flattened, duplicate operands are dropped and implications become
+    disjunctions.
+
+    Nodes are Sentences, so they work with logic.model_check and can be
+    mixed with the logic connectives.
+    """
+
+    _serials = itertools.count()
+
+    def __init__(self, kind, children=(), name=None):
+        self.kind = kind
+        self.children = children
+        self.name = name
+        self.serial = next(Node._serials)
+        self._order = None
+        self._symbols = None
+
+    def __repr__(self):
+        return f"Node({self.formula()})"
+
+    def topological_order(self):
+        """
+        Returns every distinct node reachable from this one, children
+        before parents.
+        """
+        if self._order is None:
+            order = []
+            seen = set()
+            stack = [(self, False)]
+            while stack:
+                node, expanded = stack.pop()
+                if expanded:
+                    order.append(node)
+                    continue
+                if node in seen:
+                    continue
+                seen.add(node)
+                stack.append((node, True))
+                for child in reversed(node.children):
+                    if child not in seen:
+                        stack.append((child, False))
+            self._order = order
+        return self._order
+
+    def size(self):
+        """
+        Returns the number of distinct nodes in this formula.
+        """
+        return len(self.topological_order())
+
+    def evaluate(self, model):
+        """
+        Evaluates the formula in `model`, computing each shared node once.
+        """
+        values = dict()
+        for node in self.topological_order():
+            kind = node.kind
+            if kind == SYMBOL:
+                try:
+                    value = bool(model[node.name])
+                except KeyError:
+                    raise Exception(f"variable {node.name} not in model")
+            elif kind == NOT:
+                value = not values[node.children[0]]
+            elif kind == AND:
+                value = all(values[child] for child in node.children)
+            elif kind == OR:
+                value = any(values[child] for child in node.children)
+            elif kind == IFF:
+                value = values[node.children[0]] == values[node.children[1]]
+            else:
+                value = kind == TRUE
+            values[node] = value
+        return values[self]
+
+    def symbols(self):
+        if self._symbols is None:
+            self._symbols = {
+                node.name for node in self.topological_order() if node.kind == SYMBOL
+            }
+        return set(self._symbols)
+
+    def formula(self):
+        if self.kind == SYMBOL:
+            return self.name
+        if self.kind in (TRUE, FALSE):
+            return "⊤" if self.kind == TRUE else "⊥"
+        if self.kind == NOT:
+            return "¬" + Sentence.parenthesize(self.children[0].formula())
+        operator = {AND: " ∧ ", OR: " ∨  ", IFF: " <=> "}[self.kind]
+        return operator.join(
+            Sentence.parenthesize(child.formula()) for child in self.children
+        )
+
+    def to_sentence(self):
+        """
+        Returns an equivalent tree of logic connectives, reusing one object
+        for each shared node.
+        """
+        built = dict()
+        for node in self.topological_order():
+            children = [built[child] for child in node.children]
+            if node.kind == SYMBOL:
+                built[node] = Symbol(node.name)
+            elif node.kind == NOT:
+                built[node] = Not(children[0])
+            elif node.kind == AND:
+                built[node] = And(*children)
+            elif node.kind == OR:
+                built[node] = Or(*children)
+            elif node.kind == IFF:
+                built[node] = Biconditional(*children)
+            elif node.kind == TRUE:
+                built[node] = And()
+            else:
+                built[node] = Or()
+        return built[self]
+
+
+# Every live node, keyed by its kind and children (or name)
+_nodes = weakref.WeakValueDictionary()
+
+
+def _intern(kind, children=(), name=None):
+    key = (kind, name, children)
+    node = _nodes.get(key)
+    if node is None:
+        node = Node(kind, children, name)
+        _nodes[key] = node
+    return node
+
+
+TOP = _intern(TRUE)
+BOTTOM = _intern(FALSE)
+
+
+def symbol(name):
+    return _intern(SYMBOL, name=name)
+
+
+def negate(operand):
+    if operand is TOP:
+        return BOTTOM
+    if operand is BOTTOM:
+        return TOP
+    if operand.kind == NOT:
+        return operand.children[0]
+    return _intern(NOT, (operand,))
+
+
+def conjoin(*operands):
+    return _junction(AND, TOP, BOTTOM, operands)
+
+
+def disjoin(*operands):
+    return _junction(OR, BOTTOM, TOP, operands)
+
+
+def implies(antecedent, consequent):
+    return disjoin(negate(antecedent), consequent)
+
+
+def iff(left, right):
+    if left is right:
+        return TOP
+    if left is negate(right):
+        return BOTTOM
+    for constant, other in ((left, right), (right, left)):
+        if constant is TOP:
+            return other
+        if constant is BOTTOM:
+            return negate(other)
+    left, right = sorted((left, right), key=lambda node: node.serial)
+    return _intern(IFF, (left, right))
+
+
+def _junction(kind, identity, absorbing, operands):
+    """
+    Builds a flattened, folded AND or OR node: `identity` operands are
+    dropped, an `absorbing` operand (or an operand and its negation) gives
+    `absorbing`, and operands are deduplicated and put in creation order
+    so equal formulas intern to the same node.
+    """
+    flat = dict()
+    stack = list(reversed(operands))
+    while stack:
+        operand = stack.pop()
+        if operand.kind == kind:
+            stack.extend(reversed(operand.children))
+        elif operand is absorbing:
+            return absorbing
+        elif operand is not identity:
+            flat[operand.serial] = operand
+
+    for operand in flat.values():
+        if operand.kind == NOT and operand.children[0].serial in flat:
+            return absorbing
+    if not flat:
+        return identity
+    if len(flat) == 1:
+        return next(iter(flat.values()))
+    return _intern(kind, tuple(flat[serial] for serial in sorted(flat)))
+
+
+def intern(sentence):
+    """
+    Returns the DAG node for a sentence built from the logic connectives.
+    """
+    if isinstance(sentence, Node):
+        return sentence
+    if isinstance(sentence, Symbol):
+        return symbol(sentence.name)
+    if isinstance(sentence, Not):
+        return negate(intern(sentence.operand))
+    if isinstance(sentence, And):
+        return conjoin(*(intern(c) for c in sentence.conjuncts))
+    if isinstance(sentence, Or):
+        return disjoin(*(intern(d) for d in sentence.disjuncts))
+    if isinstance(sentence, Implication):
+        return implies(intern(sentence.antecedent), intern(sentence.consequent))
+    if isinstance(sentence, Biconditional):
+        return iff(intern(sentence.left), intern(sentence.right))
+    raise TypeError(f"Cannot intern {sentence!r}")
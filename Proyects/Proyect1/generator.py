@@ -0,0 +1,210 @@
+import argparse
+import json
+import multiprocessing
+import random
+import string
+import time
+
+from logic import And, Implication, Not, Or, Symbol
+from sat import EntailmentSession
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate random knights-and-knaves puzzles and solve them in bulk."
+    )
+    parser.add_argument("-n", "--puzzles", type=int, default=1000)
+    parser.add_argument("-c", "--characters", type=int, default=3)
+    parser.add_argument("-m", "--statements", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=5.0,
+                        help="seconds allowed per puzzle")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--show", action="store_true",
+                        help="print the first puzzle and its solution")
+    parser.add_argument("-o", "--output", help="write JSON stats here instead of stdout")
+    args = parser.parse_args()
+
+    if args.show:
+        puzzle = generate(args.characters, args.statements, random.Random(args.seed))
+        for line in puzzle.statements:
+            print(line)
+        for literal in sorted(map(str, EntailmentSession(puzzle.knowledge).entailed())):
+            print(f"    {literal}")
+
+    stats = solve_bulk(args.puzzles, args.characters, args.statements,
+                       args.timeout, args.seed, args.processes)
+    text = json.dumps(stats, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+class Puzzle():
+    """
+    A knights-and-knaves puzzle: who the characters are, what each of them
+    said, and the knowledge base encoding it.
+    """
+
+    def __init__(self, characters, statements, knowledge):
+        self.characters = characters
+        self.statements = statements
+        self.knowledge = knowledge
+
+
+def character_name(index):
+    """
+    Returns "A", "B", ..., "Z", "A2", "B2", ... for index 0, 1, 2, ...
+    """
+    letter = string.ascii_uppercase[index % 26]
+    round = index // 26
+    return letter if round == 0 else f"{letter}{round + 1}"
+
+
+def knight(name):
+    return Symbol(f"{name} is a Knight")
+
+
+def knave(name):
+    return Symbol(f"{name} is a Knave")
+
+
+def knowledge_base(names):
+    """
+    Returns the rules every puzzle shares: each character is
+    a knight or a knave, but not both.
+    """
+    return And(
+        *(Or(knight(name), knave(name)) for name in names),
+        *(Not(And(knight(name), knave(name))) for name in names),
+    )
+
+
+def random_claim(speaker, names, rng):
+    """
+    Returns (text, sentence, truth) for a random claim `speaker` could make
+    about one or two characters (possibly themselves), where `truth`
+    evaluates it given which characters are knights.
+    """
+    x, y = rng.sample(names, 2) if len(names) > 1 else (names[0], names[0])
+    x_is = "I am" if x == speaker else f"{x} is"
+
+    def both(word):
+        if speaker in (x, y) and x != y:
+            return f"{y if x == speaker else x} {word} I"
+        return f"{x} {word} {y}"
+
+    kind = rng.randrange(6)
+    if kind == 0:
+        return f"{x_is} a knight.", knight(x), lambda knights: knights[x]
+    if kind == 1:
+        return f"{x_is} a knave.", knave(x), lambda knights: not knights[x]
+    if kind == 2:
+        return (f"{both('and')} are both knaves.", And(knave(x), knave(y)),
+                lambda knights: not knights[x] and not knights[y])
+    if kind == 3:
+        return (f"{both('or')} is a knight.", Or(knight(x), knight(y)),
+                lambda knights: knights[x] or knights[y])
+    if kind == 4:
+        return (f"{both('and')} are the same kind.",
+                Or(And(knight(x), knight(y)), And(knave(x), knave(y))),
+                lambda knights: knights[x] == knights[y])
+    return (f"{both('and')} are of different kinds.",
+            Or(And(knight(x), knave(y)), And(knave(x), knight(y))),
+            lambda knights: knights[x] != knights[y])
+
+
+def generate(characters, statements, rng):
+    """
+    Returns a random Puzzle with `characters` characters making
+    `statements` statements in total. A knight's statement is true
+    and a knave's is false.
+
+    Each character is secretly made a knight or a knave first, and a
+    claim is negated when needed so the speaker tells the truth exactly
+    when they are a knight; every puzzle has that world as a solution.
+    """
+    names = [character_name(i) for i in range(characters)]
+    knights = {name: rng.random() < 0.5 for name in names}
+    knowledge = knowledge_base(names)
+    lines = []
+    for _ in range(statements):
+        speaker = rng.choice(names)
+        text, claim, truth = random_claim(speaker, names, rng)
+        if truth(knights) != knights[speaker]:
+            text, claim = f"It is not true that {text}", Not(claim)
+        lines.append(f'{speaker} says "{text}"')
+        knowledge.add(Implication(knight(speaker), claim))
+        knowledge.add(Implication(knave(speaker), Not(claim)))
+    return Puzzle(names, lines, knowledge)
+
+
+def solve_bulk(puzzles, characters, statements, timeout=5.0, seed=0, processes=None):
+    """
+    Generates and solves `puzzles` seeded puzzles across a process pool and
+    returns how many had a unique solution, several, or none, how many
+    timed out, and the distribution of solve times.
+    """
+    jobs = [(characters, statements, seed + index, timeout) for index in range(puzzles)]
+    with multiprocessing.Pool(processes) as pool:
+        results = pool.map(solve_one, jobs, chunksize=max(1, puzzles // 64))
+
+    outcomes = {"unique": 0, "multiple": 0, "contradictory": 0, "timeout": 0}
+    times = []
+    for outcome, seconds in results:
+        outcomes[outcome] += 1
+        if outcome != "timeout":
+            times.append(seconds)
+    times.sort()
+
+    def at(fraction):
+        return 1000 * times[min(len(times) - 1, int(fraction * len(times)))] if times else 0.0
+
+    return {
+        "puzzles": puzzles,
+        "characters": characters,
+        "statements": statements,
+        "seed": seed,
+        **outcomes,
+        "unique_rate": outcomes["unique"] / puzzles if puzzles else 0.0,
+        "solve_ms": {
+            "mean": 1000 * sum(times) / len(times) if times else 0.0,
+            "p50": at(0.50),
+            "p90": at(0.90),
+            "p99": at(0.99),
+            "max": 1000 * times[-1] if times else 0.0,
+        },
+    }
+
+
+def solve_one(job):
+    """
+    Generates one puzzle in a worker and solves it. Returns its outcome and
+    the seconds taken: "unique" if every character's kind is entailed,
+    "contradictory" if no assignment fits, "multiple" otherwise.
+    """
+    characters, statements, seed, timeout = job
+    puzzle = generate(characters, statements, random.Random(seed))
+
+    start = time.perf_counter()
+    session = EntailmentSession(puzzle.knowledge)
+    session.solver.deadline = start + timeout
+    try:
+        if not session.solver.solve():
+            outcome = "contradictory"
+        else:
+            entailed = session.entailed()
+            known = sum(
+                knight(name) in entailed or knave(name) in entailed
+                for name in puzzle.characters
+            )
+            outcome = "unique" if known == characters else "multiple"
+    except TimeoutError:
+        return "timeout", timeout
+    return outcome, time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    main()
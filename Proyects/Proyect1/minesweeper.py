@@ -1,5 +1,16 @@
 import itertools
+import math
 import random
+import time
+from collections import deque
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Seconds a probabilistic guess may spend counting mine layouts
+GUESS_TIME = 0.1
 
 class Minesweeper():
     """
@@ -83,41 +94,105 @@ class Minesweeper():
         return self.mines_found == self.mines
 
 
+class ArrayMinesweeper(Minesweeper):
+    """
+    Minesweeper game on a NumPy boolean board, for large simulations.
+    Mines are placed with one sample without replacement and every
+    cell's neighbour count is computed up front, so nearby_mines()
+    is a single array lookup.
+    """
+
+    def __init__(self, height=8, width=8, mines=8, seed=None):
+        if np is None:
+            raise ImportError("ArrayMinesweeper requires numpy")
+        if not 0 <= mines <= height * width:
+            raise ValueError(f"Cannot place {mines} mines on a {height}x{width} board")
+
+        self.height = height
+        self.width = width
+
+        # Add mines randomly
+        rng = np.random.default_rng(seed)
+        flat = np.zeros(height * width, dtype=bool)
+        flat[rng.choice(height * width, size=mines, replace=False)] = True
+        self.board = flat.reshape(height, width)
+        rows, cols = np.nonzero(self.board)
+        self.mines = set(zip(rows.tolist(), cols.tolist()))
+
+        # Mines within one row and column of each cell: the board convolved
+        # with a 3x3 kernel of ones minus its centre, as shifted slices
+        padded = np.pad(self.board, 1).astype(np.uint8)
+        counts = np.zeros((height, width), dtype=np.uint8)
+        for di in range(3):
+            for dj in range(3):
+                if (di, dj) != (1, 1):
+                    counts += padded[di:di + height, dj:dj + width]
+        self.counts = counts
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def is_mine(self, cell):
+        i, j = cell
+        return bool(self.board[i, j])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        i, j = cell
+        return int(self.counts[i, j])
+
+
 class Sentence():
     """
     Logical statement about a Minesweeper game
     A sentence consists of a set of board cells,
     and a count of the number of those cells which are mines.
+    Sentences are immutable and hashable, so equal sentences
+    collapse to one entry in a set.
     """
 
     def __init__(self, cells, count):
-        self.cells = set(cells)
+        self.cells = frozenset(cells)
         self.count = count
 
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
+    def __hash__(self):
+        return hash((self.cells, self.count))
+
     def __str__(self):
-        return f"{self.cells} = {self.count}"
+        return f"{set(self.cells)} = {self.count}"
 
     def known_mines(self):
         if len(self.cells) == self.count and self.count != 0:
             return self.cells
-        return set()
+        return frozenset()
 
     def known_safes(self):
         if self.count == 0:
             return self.cells
-        return set()
+        return frozenset()
 
     def mark_mine(self, cell):
+        """
+        Returns the sentence that results from `cell` being a mine.
+        """
         if cell in self.cells:
-            self.cells.remove(cell)
-            self.count -= 1
+            return Sentence(self.cells - {cell}, self.count - 1)
+        return self
 
     def mark_safe(self, cell):
+        """
+        Returns the sentence that results from `cell` being safe.
+        """
         if cell in self.cells:
-            self.cells.remove(cell)
+            return Sentence(self.cells - {cell}, self.count)
+        return self
 
 
 class MinesweeperAI():
@@ -125,12 +200,20 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, mines=8, guess="probability",
+                 guess_time=GUESS_TIME):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Total number of mines, used to weigh guesses, and how to guess:
+        # "probability" picks the cell least likely to be a mine,
+        # "uniform" picks any unknown cell at random
+        self.total_mines = mines
+        self.guess = guess
+        self.guess_time = guess_time
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -138,8 +221,16 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Set of sentences about the game known to be true. Sentences only
+        # mention cells not yet known to be mines or safes, empty sentences
+        # are dropped and equal sentences collapse, so the knowledge base
+        # stays bounded by the frontier of unknown cells.
+        self.knowledge = set()
+
+        # Sentences indexed by the cells they mention, and the sentences
+        # added since the last fixed point was reached
+        self.sentences_by_cell = dict()
+        self.pending = deque()
 
     def mark_mine(self, cell):
         """
@@ -147,8 +238,9 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        for sentence in self.sentences_by_cell.pop(cell, set()):
+            self.remove_sentence(sentence)
+            self.add_sentence(sentence.mark_mine(cell))
 
     def mark_safe(self, cell):
         """
@@ -156,8 +248,69 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        for sentence in self.sentences_by_cell.pop(cell, set()):
+            self.remove_sentence(sentence)
+            self.add_sentence(sentence.mark_safe(cell))
+
+    def add_sentence(self, sentence):
+        """
+        Adds `sentence` to the knowledge base and queues it for propagation,
+        unless it is empty or already known.
+        """
+        if not sentence.cells or sentence in self.knowledge:
+            return False
+        self.knowledge.add(sentence)
+        for cell in sentence.cells:
+            self.sentences_by_cell.setdefault(cell, set()).add(sentence)
+        self.pending.append(sentence)
+        return True
+
+    def remove_sentence(self, sentence):
+        """
+        Removes `sentence` from the knowledge base and the cell index.
+        """
+        self.knowledge.discard(sentence)
+        for cell in sentence.cells:
+            sentences = self.sentences_by_cell.get(cell)
+            if sentences is not None:
+                sentences.discard(sentence)
+                if not sentences:
+                    del self.sentences_by_cell[cell]
+
+    def propagate(self):
+        """
+        Runs inference over the pending sentences until a fixed point:
+        sentences that pin down their cells mark them as mines or safes,
+        and every other sentence is checked against the sentences it shares
+        a cell with for subset inferences. Any sentence that changes or is
+        added goes back on the worklist.
+        """
+        while self.pending:
+            sentence = self.pending.popleft()
+            if sentence not in self.knowledge:
+                continue
+
+            known_mines = list(sentence.known_mines())
+            known_safes = list(sentence.known_safes())
+            if known_mines or known_safes:
+                for cell in known_mines:
+                    self.mark_mine(cell)
+                for cell in known_safes:
+                    self.mark_safe(cell)
+                continue
+
+            neighbours = set()
+            for cell in sentence.cells:
+                neighbours.update(self.sentences_by_cell[cell])
+            for other in neighbours:
+                if other.cells == sentence.cells:
+                    continue
+                if sentence.cells < other.cells:
+                    self.add_sentence(Sentence(other.cells - sentence.cells,
+                                               other.count - sentence.count))
+                elif other.cells < sentence.cells:
+                    self.add_sentence(Sentence(sentence.cells - other.cells,
+                                               sentence.count - other.count))
 
     def add_knowledge(self, cell, count):
         """
@@ -189,26 +342,8 @@ class MinesweeperAI():
 
         NewSentence = Sentence(underDetinedCells, count - Count_mines)
 
-        self.knowledge.append(NewSentence)
-
-        for sentence in self.knowledge.copy():
-            known_mines = sentence.known_mines().copy()
-            known_safes = sentence.known_safes().copy()
-            if known_mines:
-                for cell in known_mines:
-                    self.mark_mine(cell)
-            if known_safes:
-                for cell in known_safes:
-                    self.mark_safe(cell)
-
-        for sentence1 in self.knowledge.copy():
-            for sentence2 in self.knowledge.copy():
-                if sentence1 != sentence2 and sentence1.cells.issubset(sentence2.cells):
-                    new_cells = sentence2.cells - sentence1.cells
-                    new_count = sentence2.count - sentence1.count
-                    inferred_sentence = Sentence(new_cells, new_count)
-                    if inferred_sentence not in self.knowledge:
-                        self.knowledge.append(inferred_sentence)
+        self.add_sentence(NewSentence)
+        self.propagate()
 
     def make_safe_move(self):
         for cell in self.safes:
@@ -217,6 +352,15 @@ class MinesweeperAI():
         return None
 
     def make_random_move(self):
+        """
+        Returns a move to make when no cell is known to be safe,
+        or None if every cell has been played or is a known mine.
+        """
+        if self.guess == "uniform":
+            return self.uniform_move()
+        return self.best_guess()
+
+    def uniform_move(self):
         possibleMoves = []
         for i in range(self.height):
             for j in range(self.width):
@@ -226,3 +370,227 @@ class MinesweeperAI():
             return random.choice(possibleMoves)
         else:
             return None
+
+    def best_guess(self):
+        """
+        Returns the unknown cell with the lowest probability of being a mine.
+        Frontier cells (those mentioned by some sentence) are scored exactly
+        by counting the mine layouts consistent with the knowledge base;
+        every other unknown cell gets the density of the mines left over.
+        """
+        deadline = time.perf_counter() + self.guess_time
+        probabilities, outside = self.mine_probabilities(deadline)
+        best = min(probabilities, key=probabilities.get, default=None)
+        if best is None or outside < probabilities[best]:
+            return self.outside_cell() or best
+        return best
+
+    def mine_probabilities(self, deadline):
+        """
+        Returns (probabilities, outside): the chance that each frontier cell
+        is a mine, and the chance for any unknown cell off the frontier.
+        Falls back to a local estimate if counting passes `deadline`.
+        """
+        frontier = set(self.sentences_by_cell)
+        unknown = self.height * self.width - len(self.safes) - len(self.mines)
+        outside_cells = unknown - len(frontier)
+        mines_left = self.total_mines - len(self.mines)
+
+        counts = []
+        for cells, sentences in self.components():
+            counted = count_layouts(cells, sentences, deadline)
+            if counted is None:
+                return self.local_probabilities(outside_cells, mines_left)
+            counts.append(counted)
+
+        probabilities = dict()
+        everything = {0: 1}
+        for totals, _ in counts:
+            everything = convolve(everything, totals)
+
+        # Layouts of the cells off the frontier for each frontier mine count,
+        # relative to the likeliest count. Exact binomials over the whole
+        # off-frontier area of a large board take seconds, so the logs of
+        # C(n, r - 1) / C(n, r) = r / (n - r + 1) are summed instead
+        logs = dict()
+        log = 0.0
+        for m in range(max(0, mines_left - outside_cells), min(mines_left, max(everything)) + 1):
+            if logs:
+                rest = mines_left - m + 1
+                log += math.log(rest / (outside_cells - rest + 1))
+            logs[m] = log
+        top = max(logs.values(), default=0.0)
+
+        def ways(other_mines):
+            return math.exp(logs[other_mines] - top) if other_mines in logs else 0.0
+
+        total = sum(count * ways(m) for m, count in everything.items())
+        if total == 0:
+            return self.local_probabilities(outside_cells, mines_left)
+
+        for index, (totals, cell_totals) in enumerate(counts):
+            if time.perf_counter() > deadline:
+                return self.local_probabilities(outside_cells, mines_left)
+            others = {0: 1}
+            for other, (other_totals, _) in enumerate(counts):
+                if other != index:
+                    others = convolve(others, other_totals)
+            weight = {
+                m: sum(count * ways(m + rest) for rest, count in others.items())
+                for m in totals
+            }
+            for cell, mine_totals in cell_totals.items():
+                probabilities[cell] = sum(
+                    count * weight[m] for m, count in mine_totals.items()
+                ) / total
+
+        outside = 1.0
+        if outside_cells:
+            expected = sum(
+                count * ways(m) * (mines_left - m) for m, count in everything.items()
+            )
+            outside = expected / total / outside_cells
+        return probabilities, outside
+
+    def local_probabilities(self, outside_cells, mines_left):
+        """
+        Returns a cheap (probabilities, outside) estimate: each frontier cell
+        gets the highest mine density among the sentences mentioning it.
+        """
+        probabilities = {
+            cell: max(sentence.count / len(sentence.cells) for sentence in sentences)
+            for cell, sentences in self.sentences_by_cell.items()
+        }
+        outside = mines_left / outside_cells if outside_cells else 1.0
+        return probabilities, outside
+
+    def components(self):
+        """
+        Yields (cells, sentences) for each group of frontier cells linked by
+        shared sentences, with cells in breadth-first order.
+        """
+        seen = set()
+        for start in self.sentences_by_cell:
+            if start in seen:
+                continue
+            seen.add(start)
+            cells = []
+            sentences = set()
+            queue = deque([start])
+            while queue:
+                cell = queue.popleft()
+                cells.append(cell)
+                for sentence in self.sentences_by_cell[cell]:
+                    if sentence in sentences:
+                        continue
+                    sentences.add(sentence)
+                    for other in sentence.cells:
+                        if other not in seen:
+                            seen.add(other)
+                            queue.append(other)
+            yield cells, sentences
+
+    def outside_cell(self):
+        """
+        Returns a random unknown cell that no sentence mentions, or None.
+        """
+        for _ in range(32):
+            cell = (random.randrange(self.height), random.randrange(self.width))
+            if self.is_outside(cell):
+                return cell
+        outside = [
+            (i, j) for i in range(self.height) for j in range(self.width)
+            if self.is_outside((i, j))
+        ]
+        return random.choice(outside) if outside else None
+
+    def is_outside(self, cell):
+        return (cell not in self.safes and cell not in self.mines and
+                cell not in self.sentences_by_cell)
+
+
+def count_layouts(cells, sentences, deadline):
+    """
+    Counts the mine layouts of `cells` consistent with `sentences`, grouped by
+    number of mines. Returns (totals, cell_totals) where totals[m] is the
+    number of layouts with m mines and cell_totals[cell][m] how many of those
+    put a mine in `cell`, or None if `deadline` passes first.
+
+    Cells are assigned in order; the state after each cell is the number of
+    mines each sentence still needs, so layouts that agree on it are counted
+    together (forward pass), and completions are counted once per state
+    (backward pass).
+    """
+    position = {cell: pos for pos, cell in enumerate(cells)}
+    sentences = list(sentences)
+
+    # For each position: (sentence index, cells of it still to come after)
+    touching = [[] for _ in cells]
+    for index, sentence in enumerate(sentences):
+        positions = sorted(position[cell] for cell in sentence.cells)
+        for rank, pos in enumerate(positions):
+            touching[pos].append((index, len(positions) - rank - 1))
+
+    def advance(state, pos, value):
+        state = list(state)
+        for index, after in touching[pos]:
+            needed = state[index] - value
+            if needed < 0 or needed > after:
+                return None
+            state[index] = needed
+        return tuple(state)
+
+    start = tuple(sentence.count for sentence in sentences)
+    levels = [{start: {0: 1}}]
+    for pos in range(len(cells)):
+        if time.perf_counter() > deadline:
+            return None
+        following = dict()
+        for state, counts in levels[-1].items():
+            for value in (0, 1):
+                child = advance(state, pos, value)
+                if child is not None:
+                    add_shifted(following.setdefault(child, dict()), counts, value)
+        levels.append(following)
+
+    completions = {state: {0: 1} for state in levels[-1]}
+    cell_totals = dict()
+    for pos in range(len(cells) - 1, -1, -1):
+        if time.perf_counter() > deadline:
+            return None
+        current = dict()
+        mine_totals = dict()
+        for state, before in levels[pos].items():
+            counts = dict()
+            for value in (0, 1):
+                child = advance(state, pos, value)
+                if child is None or child not in completions:
+                    continue
+                add_shifted(counts, completions[child], value)
+                if value:
+                    add_shifted(mine_totals, convolve(before, completions[child]), 1)
+            if counts:
+                current[state] = counts
+        cell_totals[cells[pos]] = mine_totals
+        completions = current
+
+    return completions.get(start, dict()), cell_totals
+
+
+def add_shifted(target, counts, shift):
+    """
+    Adds counts[m] to target[m + shift] for every m.
+    """
+    for m, count in counts.items():
+        target[m + shift] = target.get(m + shift, 0) + count
+
+
+def convolve(a, b):
+    """
+    Returns the counts of the sum of two independent mine counts.
+    """
+    result = dict()
+    for m, count in a.items():
+        for n, other in b.items():
+            result[m + n] = result.get(m + n, 0) + count * other
+    return result
@@ -1,4 +1,5 @@
 from logic import *
+from sat import EntailmentSession
 #I need to make a logical setence to do a model checking algorithm\
 #A knave is always telling the LIE
 #a knight is always telling the truth
@@ -69,7 +70,6 @@ knowledge3 = And(
     Implication(CKnight, AKnight),
     Implication(CKnave, Not(AKnight))
 )
-print(knowledge3.formula())
 
 def main():
     symbols = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
@@ -84,8 +84,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            entailed = EntailmentSession(knowledge).entailed()
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if symbol in entailed:
                     print(f"    {symbol}")
 
 
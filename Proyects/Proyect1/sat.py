@@ -0,0 +1,450 @@
+import time
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Variable activity decay and restart schedule of the solver
+DECAY = 0.95
+RESTART_FIRST = 100
+RESTART_GROWTH = 1.5
+
+
+def model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query, with the same answers as the
+    truth-table model_check: true exactly when knowledge ∧ ¬query has no model.
+    """
+    return EntailmentSession(knowledge).entails(query)
+
+
+class EntailmentSession():
+    """
+    A knowledge base compiled once into a solver, for asking many
+    entailment queries. Each query is encoded into the same solver and
+    decided by solving under the assumption that it is false, so clauses
+    learned for one query speed up the next.
+    """
+
+    def __init__(self, knowledge):
+        self.cnf = CNF()
+        self.cnf.assert_sentence(knowledge)
+        self.solver = Solver()
+        self.synced = 0
+        self.sync()
+
+    def sync(self):
+        """
+        Passes clauses added to the CNF since the last call on to the solver.
+        """
+        for clause in self.cnf.clauses[self.synced:]:
+            self.solver.add_clause(clause)
+        self.synced = len(self.cnf.clauses)
+
+    def entails(self, query):
+        """
+        Returns True if the knowledge base entails `query`.
+        """
+        literal = self.cnf.literal(query)
+        self.sync()
+        return not self.solver.solve([-literal])
+
+    def entailed(self):
+        """
+        Returns the set of every symbol and negated symbol of the knowledge
+        base that it entails.
+
+        One model gives each symbol a candidate value; a candidate is
+        entailed if no model flips it, and each model found while checking
+        rules out every candidate it disagrees with.
+        """
+        symbols = self.cnf.symbols
+        if not self.solver.solve():
+            return ({Symbol(name) for name in symbols} |
+                    {Not(Symbol(name)) for name in symbols})
+
+        candidates = {name: self.solver.model[v] for name, v in symbols.items()}
+        result = set()
+        for name, v in symbols.items():
+            if name not in candidates:
+                continue
+            value = candidates.pop(name)
+            literal = v if value else -v
+            if self.solver.solve([-literal]):
+                model = self.solver.model
+                for other in list(candidates):
+                    if model[symbols[other]] != candidates[other]:
+                        del candidates[other]
+            else:
+                result.add(Symbol(name) if value else Not(Symbol(name)))
+
+                # Entailed, so it may be added as a fact for later queries
+                self.solver.add_clause([literal])
+        return result
+
+
+class CNF():
+    """
+    Clauses over integer variables, built from logic sentences with the
+    Tseitin encoding: every connective gets a fresh variable defined to be
+    equivalent to it, so the clause count grows linearly with the sentence.
+    A literal is +v or -v for variable v.
+    """
+
+    def __init__(self):
+        self.variables = 0
+        self.clauses = []
+
+        # Symbol name -> variable
+        self.symbols = dict()
+
+        # Structurally identical subformulas share one variable:
+        # (connective, child literals) -> literal
+        self.definitions = dict()
+
+    def new_variable(self):
+        self.variables += 1
+        return self.variables
+
+    def assert_sentence(self, sentence):
+        """
+        Adds clauses requiring `sentence` to be true. Top-level conjunctions
+        are split so each conjunct is asserted directly.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.assert_sentence(conjunct)
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the clauses
+        that define it.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.symbols:
+                self.symbols[sentence.name] = self.new_variable()
+            return self.symbols[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if isinstance(sentence, And):
+            return self.conjunction([self.literal(c) for c in sentence.conjuncts])
+        if isinstance(sentence, Or):
+            return -self.conjunction([-self.literal(d) for d in sentence.disjuncts])
+        if isinstance(sentence, Implication):
+            antecedent = self.literal(sentence.antecedent)
+            consequent = self.literal(sentence.consequent)
+            return -self.conjunction([antecedent, -consequent])
+        if isinstance(sentence, Biconditional):
+            return self.equivalence(self.literal(sentence.left),
+                                    self.literal(sentence.right))
+        raise TypeError(f"Cannot convert {sentence!r} to CNF")
+
+    def conjunction(self, literals):
+        """
+        Returns a literal equivalent to the conjunction of `literals`.
+        """
+        literals = sorted(set(literals))
+        if len(literals) == 1:
+            return literals[0]
+        key = ("and", tuple(literals))
+        if key not in self.definitions:
+            a = self.new_variable()
+            for literal in literals:
+                self.clauses.append([-a, literal])
+            self.clauses.append([a] + [-literal for literal in literals])
+            self.definitions[key] = a
+        return self.definitions[key]
+
+    def equivalence(self, p, q):
+        """
+        Returns a literal equivalent to p <=> q.
+        """
+        key = ("iff",) + tuple(sorted((p, q)))
+        if key not in self.definitions:
+            a = self.new_variable()
+            self.clauses.append([-a, -p, q])
+            self.clauses.append([-a, p, -q])
+            self.clauses.append([a, p, q])
+            self.clauses.append([a, -p, -q])
+            self.definitions[key] = a
+        return self.definitions[key]
+
+
+class Solver():
+    """
+    CDCL satisfiability solver: unit propagation with two watched literals
+    per clause, first-UIP clause learning with non-chronological
+    backjumping, activity-based branching and geometric restarts.
+
+    solve() may be called repeatedly with different assumptions; clauses
+    learned in one call stay valid for the next. If `deadline` is set to a
+    time.perf_counter() value, solve() raises TimeoutError once it passes.
+    """
+
+    def __init__(self, variables=0, clauses=()):
+        self.variables = 0
+        self.clauses = []
+        self.watches = dict()
+        self.value = [None]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.trail = []
+        self.trail_lim = []
+        self.queue_head = 0
+        self.increment = 1.0
+        self.inconsistent = False
+        self.model = None
+        self.deadline = None
+
+        self.ensure_variables(variables)
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def ensure_variables(self, variables):
+        """
+        Makes room for variables numbered up to `variables`.
+        """
+        while self.variables < variables:
+            self.variables += 1
+            v = self.variables
+            self.value.append(None)
+            self.level.append(0)
+            self.reason.append(None)
+            self.activity.append(0.0)
+            self.phase.append(False)
+            self.watches[v] = []
+            self.watches[-v] = []
+
+    def literal_value(self, literal):
+        value = self.value[abs(literal)]
+        if value is None or literal > 0:
+            return value
+        return not value
+
+    def add_clause(self, clause):
+        """
+        Adds a clause (a list of literals). Must be called between solves.
+        Returns False if the clauses are now known to be unsatisfiable.
+        """
+        self.backjump(0)
+        self.ensure_variables(max((abs(literal) for literal in clause), default=0))
+        if self.inconsistent:
+            return False
+
+        literals = []
+        for literal in set(clause):
+            if -literal in literals:
+                return True
+            value = self.literal_value(literal)
+            if value is True:
+                return True
+            if value is None:
+                literals.append(literal)
+
+        if not literals:
+            self.inconsistent = True
+            return False
+        if len(literals) == 1:
+            self.assign(literals[0], None)
+            if self.propagate() is not None:
+                self.inconsistent = True
+                return False
+            return True
+        self.attach(literals)
+        return True
+
+    def attach(self, literals):
+        index = len(self.clauses)
+        self.clauses.append(literals)
+        self.watches[literals[0]].append(index)
+        self.watches[literals[1]].append(index)
+        return index
+
+    def assign(self, literal, reason):
+        v = abs(literal)
+        self.value[v] = literal > 0
+        self.level[v] = len(self.trail_lim)
+        self.reason[v] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal forced by unit clauses. Returns the index of a
+        conflicting clause, or None.
+        """
+        while self.queue_head < len(self.trail):
+            false_literal = -self.trail[self.queue_head]
+            self.queue_head += 1
+            watching = self.watches[false_literal]
+            kept = []
+            conflict = None
+            for position, index in enumerate(watching):
+                clause = self.clauses[index]
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.literal_value(clause[0]) is True:
+                    kept.append(index)
+                    continue
+
+                # Look for a new literal to watch instead of the false one
+                for k in range(2, len(clause)):
+                    if self.literal_value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches[clause[1]].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self.literal_value(clause[0]) is False:
+                        conflict = index
+                        kept.extend(watching[position + 1:])
+                        break
+                    self.assign(clause[0], index)
+            self.watches[false_literal] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the first-UIP clause learned from a conflict, with the
+        asserting literal first, and the level to backjump to.
+        """
+        learned = [None]
+        seen = set()
+        current = len(self.trail_lim)
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+
+        while True:
+            for other in clause:
+                v = abs(other)
+                if other == literal or v in seen or self.level[v] == 0:
+                    continue
+                seen.add(v)
+                self.bump(v)
+                if self.level[v] == current:
+                    pending += 1
+                else:
+                    learned.append(other)
+
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            seen.discard(abs(literal))
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reason[abs(literal)]]
+
+        learned[0] = -literal
+        if len(learned) == 1:
+            return learned, 0
+
+        # Watch the literal from the highest remaining level second
+        deepest = max(range(1, len(learned)), key=lambda k: self.level[abs(learned[k])])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, self.level[abs(learned[1])]
+
+    def bump(self, v):
+        self.activity[v] += self.increment
+        if self.activity[v] > 1e100:
+            for u in range(1, self.variables + 1):
+                self.activity[u] *= 1e-100
+            self.increment *= 1e-100
+
+    def backjump(self, level):
+        """
+        Undoes every assignment made above decision level `level`.
+        """
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for literal in self.trail[start:]:
+            v = abs(literal)
+            self.phase[v] = self.value[v]
+            self.value[v] = None
+            self.reason[v] = None
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.queue_head = min(self.queue_head, start)
+
+    def decide(self):
+        """
+        Returns the unassigned variable with the highest activity, or None.
+        """
+        best = None
+        best_activity = -1.0
+        for v in range(1, self.variables + 1):
+            if self.value[v] is None and self.activity[v] > best_activity:
+                best = v
+                best_activity = self.activity[v]
+        return best
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses have a model in which every literal in
+        `assumptions` is true, storing it in self.model (a list indexed by
+        variable); returns False otherwise.
+        """
+        self.model = None
+        self.backjump(0)
+        if self.inconsistent:
+            return False
+        self.ensure_variables(max((abs(literal) for literal in assumptions), default=0))
+        if self.propagate() is not None:
+            self.inconsistent = True
+            return False
+
+        conflicts = 0
+        restart_at = RESTART_FIRST
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.trail_lim:
+                    self.inconsistent = True
+                    return False
+                conflicts += 1
+                if self.deadline is not None and time.perf_counter() > self.deadline:
+                    self.backjump(0)
+                    raise TimeoutError("SAT solver ran out of time")
+                learned, level = self.analyze(conflict)
+                self.backjump(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.assign(learned[0], self.attach(learned))
+                self.increment /= DECAY
+                continue
+
+            if conflicts >= restart_at:
+                conflicts = 0
+                restart_at = int(restart_at * RESTART_GROWTH)
+                self.backjump(0)
+                continue
+
+            # Re-assert assumptions first, one decision level each
+            literal = None
+            while len(self.trail_lim) < len(assumptions):
+                assumption = assumptions[len(self.trail_lim)]
+                value = self.literal_value(assumption)
+                if value is False:
+                    self.backjump(0)
+                    return False
+                self.trail_lim.append(len(self.trail))
+                if value is None:
+                    literal = assumption
+                    break
+            if literal is None:
+                v = self.decide()
+                if v is None:
+                    self.model = list(self.value)
+                    self.backjump(0)
+                    return True
+                literal = v if self.phase[v] else -v
+                self.trail_lim.append(len(self.trail))
+            self.assign(literal, None)
@@ -0,0 +1,100 @@
+import numpy as np
+
+from logic import And, Biconditional, Implication, Not, Or, Symbol
+
+# Largest number of symbols model_check will enumerate, and how many models
+# (as a power of two) are evaluated per batch to bound memory
+MAX_SYMBOLS = 24
+BLOCK_BITS = 20
+
+
+def model_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by evaluating every model at once
+    on NumPy boolean arrays. Gives the same answers as logic.model_check.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    if len(symbols) > MAX_SYMBOLS:
+        raise ValueError(f"{len(symbols)} symbols is too many to enumerate "
+                         f"(at most {MAX_SYMBOLS})")
+    knowledge = compile_sentence(knowledge)
+    query = compile_sentence(query)
+    for columns, size in model_blocks(symbols):
+        counterexamples = knowledge(columns) & ~query(columns)
+        if np.broadcast_to(counterexamples, size).any():
+            return False
+    return True
+
+
+def count_models(sentence, symbols=None):
+    """
+    Returns how many assignments to `symbols` (by default the sentence's
+    own symbols) make `sentence` true.
+    """
+    symbols = sorted(sentence.symbols() if symbols is None else symbols)
+    if len(symbols) > MAX_SYMBOLS:
+        raise ValueError(f"{len(symbols)} symbols is too many to enumerate "
+                         f"(at most {MAX_SYMBOLS})")
+    evaluate = compile_sentence(sentence)
+    return sum(
+        int(np.broadcast_to(evaluate(columns), size).sum())
+        for columns, size in model_blocks(symbols)
+    )
+
+
+def model_blocks(symbols):
+    """
+    Yields (columns, size) for consecutive blocks of the 2^n models over
+    `symbols`, where columns maps each symbol name to a boolean array
+    holding its value in each model of the block.
+    """
+    total = 1 << len(symbols)
+    size = min(total, 1 << BLOCK_BITS)
+    for start in range(0, total, size):
+        models = np.arange(start, start + size, dtype=np.int64)
+        columns = {
+            name: ((models >> bit) & 1).astype(bool)
+            for bit, name in enumerate(symbols)
+        }
+        yield columns, size
+
+
+def compile_sentence(sentence):
+    """
+    Returns a function that evaluates `sentence` on a dict of boolean
+    columns (symbol name -> array), giving one truth value per model.
+    Empty conjunctions and disjunctions give a scalar that broadcasts.
+    """
+    if isinstance(sentence, Symbol):
+        name = sentence.name
+        return lambda columns: columns[name]
+    if isinstance(sentence, Not):
+        operand = compile_sentence(sentence.operand)
+        return lambda columns: ~operand(columns)
+    if isinstance(sentence, And):
+        conjuncts = [compile_sentence(c) for c in sentence.conjuncts]
+
+        def conjunction(columns):
+            value = np.True_
+            for conjunct in conjuncts:
+                value = value & conjunct(columns)
+            return value
+        return conjunction
+    if isinstance(sentence, Or):
+        disjuncts = [compile_sentence(d) for d in sentence.disjuncts]
+
+        def disjunction(columns):
+            value = np.False_
+            for disjunct in disjuncts:
+                value = value | disjunct(columns)
+            return value
+        return disjunction
+    if isinstance(sentence, Implication):
+        antecedent = compile_sentence(sentence.antecedent)
+        consequent = compile_sentence(sentence.consequent)
+        return lambda columns: ~antecedent(columns) | consequent(columns)
+    if isinstance(sentence, Biconditional):
+        left = compile_sentence(sentence.left)
+        right = compile_sentence(sentence.right)
+        return lambda columns: left(columns) == right(columns)
+    raise TypeError(f"Cannot compile {sentence!r}")
@@ -1,6 +1,13 @@
 import csv
+import heapq
 import itertools
+import multiprocessing
+import os
 import sys
+import time
+from array import array
+
+import numpy as np
 
 #if a parent has two copies of the mutated gene == pass mutated gene to the child
 #if a parent has no copies of te muated gene, then i twill no pass the mutated gene on the child
@@ -47,13 +54,59 @@ PROBS = {
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    methods = list(METHODS) + list(SAMPLERS)
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit(f"Usage: python heredity.py data.csv [{'|'.join(methods)}] [samples|seconds s]")
+    try:
+        pedigree = load_pedigree(sys.argv[1])
+    except ValueError as error:
+        sys.exit(f"{sys.argv[1]}: {error}")
+    method = sys.argv[2] if len(sys.argv) >= 3 else "eliminate"
+    if method not in methods:
+        sys.exit(f"Unknown method {method}; use one of {', '.join(methods)}")
 
     # Keep track of gene and trait probabilities for each person
     #this is what my computer will compute your AI will calculate the probability distribution over how many of copies of the gene they have, as well as whether they have the trait or no
-    probabilities = {
+    errors = None
+    if method in SAMPLERS:
+        samples, budget = None, SAMPLE_TIME
+        if len(sys.argv) == 4:
+            limit = sys.argv[3]
+            try:
+                if limit.endswith("s"):
+                    samples, budget = 1 << 62, float(limit[:-1])
+                else:
+                    samples = int(limit)
+            except ValueError:
+                sys.exit(f"Invalid limit {limit}; give a number of samples or seconds ending in s")
+            if samples < 1 or (budget is not None and not budget > 0):
+                sys.exit(f"Invalid limit {limit}; sampling needs at least one sample and some time")
+        (gene, trait), errors = sample_probabilities(pedigree, method, samples, budget)
+    else:
+        gene, trait = METHODS[method](pedigree)
+
+    # Print results
+    def show(value, p, error):
+        if errors is None:
+            print(f"    {value}: {p:.4f}")
+        else:
+            print(f"    {value}: {p:.4f} ± {error:.4f}")
+
+    for i, person in enumerate(pedigree.names):
+        print(f"{person}:")
+        print("  Gene:")
+        for g in reversed(GENES):
+            show(g, gene[i, g], errors and errors[0][i, g])
+        print("  Trait:")
+        show(True, trait[i], errors and errors[1][i])
+        show(False, max(0.0, 1 - trait[i]), errors and errors[1][i])
+
+
+def empty_probabilities(people):
+    """
+    Return a probabilities dictionary with every distribution set to 0.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -68,38 +121,109 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
 
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
+def enumerate_probabilities(people):
+    """
+    Compute every person's gene and trait distributions by summing the
+    joint probability of every assignment consistent with the evidence.
+    """
+    probabilities = empty_probabilities(people)
+    for one_gene, two_genes, have_trait, p in assignments(people):
+        update(probabilities, one_gene, two_genes, have_trait, p)
 
     # Ensure probabilities sum to 1
     normalize(probabilities)
+    return probabilities
+
+
+def enumerated_marginals(pedigree):
+    """
+    Return (gene, trait) arrays from enumerate_probabilities: each person's
+    gene count distribution and their probability of having the trait.
+    """
+    probabilities = enumerate_probabilities(pedigree.people())
+    gene = np.array([
+        [probabilities[name]["gene"][g] for g in GENES] for name in pedigree.names
+    ])
+    trait = np.array([probabilities[name]["trait"][True] for name in pedigree.names])
+    return gene, trait
+
+
+def assignments(people):
+    """
+    Yield (one_gene, two_genes, have_trait, p) for every assignment of genes
+    and traits that agrees with the known traits and has probability p > 0,
+    where p is the value joint_probability would return for it.
+
+    People are assigned parents first, one at a time, so the probability
+    of a partial assignment is known as it is built: a prefix with
+    probability 0 is dropped along with everything that extends it, and
+    people with known traits are only tried with that trait. The sets
+    yielded are reused between assignments; copy them to keep them.
+    """
+    order = parents_first(people)
+    genes = dict()
+    one_gene = set()
+    two_genes = set()
+    have_trait = set()
+    sets = {1: one_gene, 2: two_genes}
+
+    def extend(index, p):
+        if index == len(order):
+            yield one_gene, two_genes, have_trait, p
+            return
+        person = order[index]
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        known = people[person]["trait"]
+        for gene in GENES:
+            if mother is None:
+                p_gene = p * PROBS["gene"][gene]
+            else:
+                p_gene = p * INHERIT[genes[mother]][genes[father]][gene]
+            if p_gene == 0:
+                continue
+            genes[person] = gene
+            if gene in sets:
+                sets[gene].add(person)
+            for trait in ((True, False) if known is None else (known,)):
+                p_trait = p_gene * PROBS["trait"][gene][trait]
+                if p_trait == 0:
+                    continue
+                if trait:
+                    have_trait.add(person)
+                yield from extend(index + 1, p_trait)
+                have_trait.discard(person)
+            if gene in sets:
+                sets[gene].discard(person)
+
+    yield from extend(0, 1)
 
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
+
+def parents_first(people):
+    """
+    Return the names in `people` ordered so everyone comes after their parents.
+    """
+    order = []
+    placed = set()
+    for name in people:
+        stack = [name]
+        while stack:
+            person = stack[-1]
+            if person in placed:
+                stack.pop()
+                continue
+            parents = [
+                parent for parent in (people[person]["mother"], people[person]["father"])
+                if parent is not None and parent not in placed
+            ]
+            if parents:
+                stack.extend(parents)
+            else:
+                placed.add(person)
+                order.append(person)
+                stack.pop()
+    return order
 
 
 def load_data(filename):
@@ -124,16 +248,177 @@ def load_data(filename):
     return data
 
 
+class Pedigree():
+    """
+    A family tree stored as parallel arrays indexed by person number:
+    names[i], mothers[i] and fathers[i] (parent numbers, or -1 for people
+    without parents) and traits[i] (1, 0, or -1 if unknown). `order` holds
+    the person numbers with everyone after their parents.
+
+    Raises ValueError if someone is their own ancestor.
+    """
+
+    def __init__(self, names, mothers, fathers, traits):
+        self.names = names
+        self.mothers = mothers
+        self.fathers = fathers
+        self.traits = traits
+        self.order = self.parents_first()
+
+    def __len__(self):
+        return len(self.names)
+
+    def parents_first(self):
+        """
+        Return the person numbers ordered so everyone comes after their
+        parents, placing a generation at a time: the people whose
+        parents were all placed in earlier generations.
+        """
+        n = len(self.names)
+        with_parents = np.flatnonzero(self.mothers >= 0)
+
+        # Children of each person, as slices of one array
+        parents = np.concatenate([self.mothers[with_parents], self.fathers[with_parents]])
+        sort = np.argsort(parents, kind="stable")
+        children = np.concatenate([with_parents, with_parents])[sort]
+        starts = np.searchsorted(parents[sort], np.arange(n + 1))
+
+        waiting = np.where(self.mothers >= 0, 2, 0).astype(np.int8)
+        generation = np.flatnonzero(waiting == 0)
+        generations = []
+        while len(generation):
+            generations.append(generation)
+            begins = starts[generation]
+            counts = starts[generation + 1] - begins
+            slots = np.repeat(begins - np.cumsum(counts) + counts, counts)
+            kids, placed = np.unique(
+                children[slots + np.arange(len(slots))], return_counts=True
+            )
+            waiting[kids] -= placed.astype(np.int8)
+            generation = kids[waiting[kids] == 0]
+        order = np.concatenate(generations) if generations else np.zeros(0, dtype=np.int64)
+
+        if len(order) < n:
+            # Walk up from someone never placed: they always have an
+            # unplaced parent, so the walk must come back around the cycle
+            person = int(np.flatnonzero(waiting)[0])
+            path = []
+            seen = dict()
+            while person not in seen:
+                seen[person] = len(path)
+                path.append(person)
+                mother = int(self.mothers[person])
+                person = mother if waiting[mother] else int(self.fathers[person])
+            cycle = path[seen[person]:] + [person]
+            raise ValueError(
+                "family tree has a cycle: "
+                + " is a child of ".join(self.names[i] for i in cycle)
+            )
+        return order
+
+    def people(self):
+        """
+        Return the pedigree as the dictionary load_data would build.
+        """
+        return {
+            name: {
+                "name": name,
+                "mother": self.names[mother] if mother >= 0 else None,
+                "father": self.names[father] if father >= 0 else None,
+                "trait": None if trait < 0 else bool(trait),
+            }
+            for name, mother, father, trait in zip(
+                self.names, self.mothers.tolist(), self.fathers.tolist(), self.traits.tolist()
+            )
+        }
+
+
+def load_pedigree(filename):
+    """
+    Load a CSV with fields name, mother, father, trait (as for load_data)
+    into a Pedigree, in one pass over the file and with people numbered
+    in the order they are listed. Parents may be listed before or after
+    their children.
+
+    Raises ValueError for a missing column, a person with only one parent,
+    a trait other than 0, 1 or blank, a name listed twice, someone who is
+    their own parent or whose parents are the same person, a parent who
+    is never listed, or a cycle.
+    """
+    # Names are numbered as they are first seen, listed or as a parent,
+    # and each row is kept as numbers until the file has been read
+    number = dict()
+    lookup = number.setdefault
+    rows = array("q")
+    mothers = array("q")
+    fathers = array("q")
+    traits = array("b")
+
+    with open(filename, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        try:
+            columns = [header.index(field) for field in ("name", "mother", "father", "trait")]
+        except ValueError:
+            raise ValueError("expected columns name, mother, father, trait")
+        name_column, mother_column, father_column, trait_column = columns
+        width = max(columns) + 1
+        for line, row in enumerate(reader, start=2):
+            if len(row) < width:
+                if not row:
+                    continue
+                raise ValueError(f"line {line}: expected {width} fields, got {len(row)}")
+            name = row[name_column]
+            mother = row[mother_column]
+            father = row[father_column]
+            trait = TRAIT_CODES.get(row[trait_column])
+            if trait is None:
+                raise ValueError(f"line {line}: trait of {name} must be 0, 1 or blank")
+            rows.append(lookup(name, len(number)))
+            if mother and father:
+                mothers.append(lookup(mother, len(number)))
+                fathers.append(lookup(father, len(number)))
+            elif mother or father:
+                raise ValueError(f"line {line}: {name} must have both parents or neither")
+            else:
+                mothers.append(-1)
+                fathers.append(-1)
+            traits.append(trait)
+
+    names = list(number)
+    rows = np.frombuffer(rows, dtype=np.int64)
+    listed = np.bincount(rows, minlength=len(names))
+    if (listed > 1).any():
+        raise ValueError(f"{names[int(np.argmax(listed > 1))]} is listed twice")
+    if len(rows) < len(names):
+        raise ValueError(f"{names[int(np.argmin(listed))]} is a parent but is not listed")
+
+    # Renumber people in the order they are listed
+    renumber = np.empty(len(names) + 1, dtype=np.int64)
+    renumber[rows] = np.arange(len(names))
+    renumber[-1] = -1
+    names = [names[i] for i in rows.tolist()]
+    mothers = renumber[np.frombuffer(mothers, dtype=np.int64)]
+    fathers = renumber[np.frombuffer(fathers, dtype=np.int64)]
+    people = np.arange(len(names))
+    for problem, wrong in (
+        ("is their own parent", (mothers == people) | (fathers == people)),
+        ("has the same mother and father", (mothers >= 0) & (mothers == fathers)),
+    ):
+        if wrong.any():
+            raise ValueError(f"{names[int(np.argmax(wrong))]} {problem}")
+    return Pedigree(names, mothers, fathers, np.frombuffer(traits, dtype=np.int8).astype(np.int64))
+
+
 def powerset(s):
     """
-    Return a list of all possible subsets of set s.
+    Yield every subset of set s, one at a time.
     """
     s = list(s)
-    return [
-        set(s) for s in itertools.chain.from_iterable(
-            itertools.combinations(s, r) for r in range(len(s) + 1)
-        )
-    ]
+    for subset in itertools.chain.from_iterable(
+        itertools.combinations(s, r) for r in range(len(s) + 1)
+    ):
+        yield set(subset)
 
 
 def joint_probability(people, one_gene, two_genes, have_trait):
@@ -147,7 +432,20 @@ def joint_probability(people, one_gene, two_genes, have_trait):
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
     """
-    raise NotImplementedError
+    def genes(person):
+        return 2 if person in two_genes else 1 if person in one_gene else 0
+
+    p = 1
+    for person in people:
+        gene = genes(person)
+        mother = people[person]["mother"]
+        father = people[person]["father"]
+        if mother is None:
+            p *= PROBS["gene"][gene]
+        else:
+            p *= INHERIT[genes(mother)][genes(father)][gene]
+        p *= PROBS["trait"][gene][person in have_trait]
+    return p
 
 
 def update(probabilities, one_gene, two_genes, have_trait, p):
@@ -157,7 +455,10 @@ def update(probabilities, one_gene, two_genes, have_trait, p):
     Which value for each distribution is updated depends on whether
     the person is in `have_gene` and `have_trait`, respectively.
     """
-    raise NotImplementedError
+    for person in probabilities:
+        gene = 2 if person in two_genes else 1 if person in one_gene else 0
+        probabilities[person]["gene"][gene] += p
+        probabilities[person]["trait"][person in have_trait] += p
 
 
 def normalize(probabilities):
@@ -165,7 +466,574 @@ def normalize(probabilities):
     Update `probabilities` such that each probability distribution
     is normalized (i.e., sums to 1, with relative proportions the same).
     """
-    raise NotImplementedError
+    for person in probabilities:
+        for field in probabilities[person]:
+            distribution = probabilities[person][field]
+            total = sum(distribution.values())
+            for value in distribution:
+                distribution[value] /= total
+
+
+def pass_probability(gene):
+    """
+    Return the probability that a parent with `gene` copies passes the
+    gene on, accounting for mutation.
+    """
+    mutation = PROBS["mutation"]
+    return {2: 1 - mutation, 1: 0.5, 0: mutation}[gene]
+
+
+def inheritance_table():
+    """
+    Return table[mother][father][child]: the probability that a child has
+    `child` copies of the gene given how many copies each parent has.
+    """
+    table = dict()
+    for mother in GENES:
+        table[mother] = dict()
+        for father in GENES:
+            m = pass_probability(mother)
+            f = pass_probability(father)
+            table[mother][father] = {
+                2: m * f,
+                1: m * (1 - f) + (1 - m) * f,
+                0: (1 - m) * (1 - f)
+            }
+    return table
+
+
+# Batched enumeration. An assignment is a row of gene counts (0, 1 or 2)
+# and a row of traits, one column per person; every person's gene and
+# trait probability is read from lookup tables for a whole block of rows.
+
+def vectorized_probabilities(pedigree):
+    """
+    Compute every person's gene and trait distributions by enumerating all
+    assignments consistent with the evidence in blocks of BLOCK_SIZE,
+    with joint probabilities and marginal totals computed on arrays.
+    Returns (gene, trait) arrays: each person's gene count distribution
+    and their probability of having the trait.
+    """
+    n = len(pedigree)
+    mothers, fathers = pedigree.mothers, pedigree.fathers
+    known = pedigree.traits == 1
+    unknown = np.flatnonzero(pedigree.traits < 0).tolist()
+
+    gene_totals = np.zeros((n, len(GENES)))
+    trait_totals = np.zeros((n, 2))
+    total = 3 ** n * 2 ** len(unknown)
+    for start in range(0, total, BLOCK_SIZE):
+        codes = np.arange(start, min(total, start + BLOCK_SIZE), dtype=np.int64)
+
+        # Decode each row number as base-3 genes, then base-2 unknown traits
+        genes = np.empty((len(codes), n), dtype=np.int64)
+        for i in range(n):
+            genes[:, i] = codes % 3
+            codes = codes // 3
+        traits = np.tile(known, (len(codes), 1))
+        for i in unknown:
+            traits[:, i] = codes % 2 == 1
+            codes = codes // 2
+
+        p = joint_probabilities(mothers, fathers, genes, traits)
+        accumulate(gene_totals, trait_totals, genes, traits, p)
+
+    normalize_totals(gene_totals)
+    normalize_totals(trait_totals)
+    return gene_totals, trait_totals[:, 1]
+
+
+def joint_probabilities(mothers, fathers, genes, traits):
+    """
+    Return the joint probability of each row of `genes` (int array, one
+    column per person) and `traits` (bool array). `mothers` and `fathers`
+    hold each person's parent columns, or -1 for people without parents.
+    """
+    inherited = INHERIT_ARRAY[genes, genes[:, mothers], genes[:, fathers]]
+    p_gene = np.where(mothers >= 0, inherited, PRIOR_ARRAY[genes])
+    p_trait = TRAIT_ARRAY[genes, traits.astype(np.int64)]
+    return np.prod(p_gene * p_trait, axis=1)
+
+
+def accumulate(gene_totals, trait_totals, genes, traits, p):
+    """
+    Add each row's probability `p` to the totals for the gene count and
+    trait that row gives each person; the array form of update().
+    """
+    for g in GENES:
+        gene_totals[:, g] += p @ (genes == g)
+    trait_totals[:, 1] += p @ traits
+    trait_totals[:, 0] += p @ ~traits
+
+
+def normalize_totals(totals):
+    """
+    Scale each row of `totals` in place to sum to 1; the array form of normalize().
+    """
+    totals /= totals.sum(axis=1, keepdims=True)
+
+
+# Variable elimination. Each person's gene count is a variable with values
+# GENES; factors are (variables, array) pairs with one array axis per
+# variable. Known traits become factors on the person's gene; unknown traits
+# sum to one and are left out until the gene marginals are known.
+
+def eliminate_probabilities(pedigree):
+    """
+    Compute every person's gene and trait distributions exactly by
+    variable elimination over the family tree, returning (gene, trait)
+    arrays as vectorized_probabilities does.
+
+    Elimination follows a min-fill order, and the messages it produces are
+    kept so that a second, downward pass gives every person's marginal from
+    one elimination rather than one elimination per person.
+    """
+    factors = []
+    evidence = zip(pedigree.mothers.tolist(), pedigree.fathers.tolist(), pedigree.traits.tolist())
+    for person, (mother, father, trait) in enumerate(evidence):
+        if mother < 0:
+            factors.append(((person,), PRIOR_ARRAY))
+        else:
+            factors.append(((person, mother, father), INHERIT_ARRAY))
+        if trait >= 0:
+            factors.append(((person,), TRAIT_ARRAY[:, trait]))
+
+    order = min_fill_order(factors)
+    position = {person: index for index, person in enumerate(order)}
+
+    # Clique for each eliminated person: its initial factors, the upward
+    # messages it receives and the clique its own message goes to
+    initial = [[] for _ in order]
+    for factor in factors:
+        initial[min(position[v] for v in factor[0])].append(factor)
+    incoming = [[] for _ in order]
+    parent = [None] * len(order)
+    upward = [None] * len(order)
+
+    for index, person in enumerate(order):
+        product = multiply_scaled(initial[index] + [upward[child] for child in incoming[index]])
+        message = rescale(sum_out(product, person))
+        upward[index] = message
+        if message[0]:
+            parent[index] = min(position[v] for v in message[0])
+            incoming[parent[index]].append(index)
+
+    downward = [None] * len(order)
+    gene = np.zeros((len(pedigree), len(GENES)))
+    for index in range(len(order) - 1, -1, -1):
+        person = order[index]
+        received = [upward[child] for child in incoming[index]]
+        if downward[index] is not None:
+            received.append(downward[index])
+        gene[person] = marginal(multiply_scaled(initial[index] + received), person)
+
+        # Send each child clique everything except its own message, from
+        # products of the messages before and after it
+        children = incoming[index]
+        before = [multiply([])]
+        for child in children[:-1]:
+            before.append(rescale(multiply([before[-1], upward[child]])))
+        after = multiply([])
+        base = multiply(initial[index] + ([] if downward[index] is None else [downward[index]]))
+        for i, child in reversed(list(enumerate(children))):
+            product = multiply([base, before[i], after])
+            for variable in product[0]:
+                if variable not in upward[child][0]:
+                    product = sum_out(product, variable)
+            downward[child] = rescale(product)
+            after = rescale(multiply([after, upward[child]]))
+
+    trait = np.where(pedigree.traits >= 0, pedigree.traits, gene @ TRAIT_ARRAY[:, 1])
+    return gene, trait
+
+
+def min_fill_order(factors):
+    """
+    Return an elimination order over the factors' variables, each step
+    picking the variable whose elimination adds the fewest new edges
+    between its neighbours (fewest neighbours on ties).
+
+    Each variable's count of unconnected neighbour pairs is kept up to
+    date as variables are eliminated and fill edges added, so a parent of
+    many children is not rescored from scratch as each child goes.
+    """
+    neighbours = dict()
+    for variables, _ in factors:
+        for v in variables:
+            neighbours.setdefault(v, set()).update(u for u in variables if u != v)
+
+    # Unconnected pairs are all pairs less the edges among the neighbours,
+    # each of which is seen from both of its ends
+    missing = {
+        v: len(near) * (len(near) - 1) // 2 - sum(len(near & neighbours[u]) for u in near) // 2
+        for v, near in neighbours.items()
+    }
+    heap = [((missing[v], len(near)), str(v), v) for v, near in neighbours.items()]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        score, _, v = heapq.heappop(heap)
+        if v not in neighbours or (missing[v], len(neighbours[v])) != score:
+            continue
+        order.append(v)
+        near = neighbours.pop(v)
+        del missing[v]
+        touched = set(near)
+
+        # Drop v: pairs of v with a neighbour of a outside `near` were missing
+        for a in near:
+            missing[a] -= len(neighbours[a]) - 1 - len(near & neighbours[a])
+            neighbours[a].discard(v)
+
+        # Connect v's neighbours, updating everyone the new edges touch
+        for a, b in itertools.combinations(near, 2):
+            if b in neighbours[a]:
+                continue
+            common = neighbours[a] & neighbours[b]
+            missing[a] += len(neighbours[a]) - len(common)
+            missing[b] += len(neighbours[b]) - len(common)
+            for w in common:
+                missing[w] -= 1
+            touched.update(common)
+            neighbours[a].add(b)
+            neighbours[b].add(a)
+
+        for u in touched:
+            heapq.heappush(heap, ((missing[u], len(neighbours[u])), str(u), u))
+    return order
+
+
+def multiply(factors):
+    """
+    Return the product of factors, over the union of their variables.
+    """
+    variables = []
+    for scope, _ in factors:
+        variables.extend(v for v in scope if v not in variables)
+    table = np.ones([len(GENES)] * len(variables))
+    for scope, array in factors:
+        axes = [scope.index(v) for v in variables if v in scope]
+        shape = [len(GENES) if v in scope else 1 for v in variables]
+        table = table * np.transpose(array, axes).reshape(shape)
+    return tuple(variables), table
+
+
+def multiply_scaled(factors):
+    """
+    Return the product of factors up to a constant, rescaling as it goes
+    so that a clique with many incoming messages does not underflow.
+    """
+    product = multiply([])
+    for factor in factors:
+        product = rescale(multiply([product, factor]))
+    return product
+
+
+def sum_out(factor, variable):
+    """
+    Return the factor with `variable` summed away.
+    """
+    scope, table = factor
+    axis = scope.index(variable)
+    return scope[:axis] + scope[axis + 1:], table.sum(axis=axis)
+
+
+def marginal(factor, variable):
+    """
+    Return the normalized distribution of `variable` from a factor.
+    """
+    scope, table = factor
+    axes = tuple(axis for axis, v in enumerate(scope) if v != variable)
+    distribution = table.sum(axis=axes)
+    return distribution / distribution.sum()
+
+
+def rescale(factor):
+    """
+    Return the factor scaled so its largest entry is 1, which leaves
+    normalized marginals unchanged and keeps long pedigrees from underflowing.
+    """
+    scope, table = factor
+    largest = table.max()
+    return scope, (table / largest if largest > 0 else table)
+
+
+# Sampling. For pedigrees too large or too loopy for exact inference,
+# marginals are estimated from random gene assignments. Each worker process
+# gets its own RNG stream from one SeedSequence and returns running sums,
+# so results from any number of workers merge into one estimate. Trait
+# marginals are the average of P(trait | gene) over the samples rather than
+# sampled traits, which gives the same mean with less variance.
+
+def sample_probabilities(pedigree, method="gibbs", samples=None, budget=None,
+                         processes=None, seed=None):
+    """
+    Estimate every person's gene and trait distributions by likelihood
+    weighting (method "weighting") or Gibbs sampling (method "gibbs").
+
+    Sampling stops after `samples` samples in total (SAMPLES by default) or
+    `budget` seconds, whichever comes first. Returns ((gene, trait),
+    (gene_error, trait_error)): arrays as vectorized_probabilities returns,
+    and the standard error of each estimate.
+    """
+    samples = SAMPLES if samples is None else samples
+    if samples < 1:
+        raise ValueError(f"need at least one sample, got {samples}")
+    if budget is not None and not budget > 0:
+        raise ValueError(f"need a positive time budget, got {budget}")
+    processes = processes or os.cpu_count() or 1
+    streams = np.random.SeedSequence(seed).spawn(processes)
+    share = -(-samples // processes)
+    family = (pedigree.mothers, pedigree.fathers, pedigree.traits, pedigree.order)
+    jobs = [(method, family, share, budget, stream) for stream in streams]
+    if processes == 1:
+        results = [sample_worker(jobs[0])]
+    else:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.map(sample_worker, jobs)
+
+    if method == "weighting":
+        sums = merge_weights(results)
+        effective = sums["w"] ** 2 / sums["w2"]
+        if effective < MIN_EFFECTIVE:
+            print(f"Warning: likelihood weighting kept only {effective:.0f} effective "
+                  "samples; its estimates and errors are unreliable, try gibbs",
+                  file=sys.stderr)
+        gene, gene_error, trait, trait_error = weighting_estimates(sums)
+    else:
+        gene, gene_error, trait, trait_error = chain_estimates(results)
+    return (gene, trait), (gene_error, trait_error)
+
+
+def sample_worker(job):
+    """
+    Run one sampler on its own RNG stream until it has drawn its share of
+    samples or its time budget runs out, and return its running sums.
+    """
+    method, family, samples, budget, stream = job
+    rng = np.random.default_rng(stream)
+    deadline = None if budget is None else time.perf_counter() + budget
+    if method == "weighting":
+        return likelihood_weighting(*family, samples, deadline, rng)
+    return gibbs_sampling(*family, samples, deadline, rng)
+
+
+def draw(probabilities, rng):
+    """
+    Return one gene count per row of `probabilities` (rows sum to 1).
+    """
+    u = rng.random((len(probabilities), 1))
+    return np.minimum((u > np.cumsum(probabilities, axis=1)).sum(axis=1), len(GENES) - 1)
+
+
+def likelihood_weighting(mothers, fathers, traits, order, samples, deadline, rng):
+    """
+    Draw up to `samples` gene assignments, SAMPLE_BATCH at a time, by
+    sampling each person's genes from their parents' and weighting each
+    assignment by how likely it makes the known traits.
+
+    People with a known trait have their genes drawn already conditioned
+    on that trait, and the assignment is weighted by the probability of
+    the trait given their parents instead; the estimates are the same but
+    the weights vary far less.
+
+    Weights are kept as logarithms and the sums are scaled by exp(-scale)
+    so that long pedigrees with many known traits do not underflow.
+    """
+    order = order.tolist()
+    known = traits >= 0
+    sums = None
+    drawn = 0
+    while drawn < samples and (deadline is None or time.perf_counter() < deadline or not drawn):
+        size = min(SAMPLE_BATCH, samples - drawn)
+        genes = np.empty((size, len(mothers)), dtype=np.int64)
+        log_weights = np.zeros(size)
+        for i in order:
+            if mothers[i] < 0:
+                probabilities = np.broadcast_to(PRIOR_ARRAY, (size, len(GENES)))
+            else:
+                probabilities = INHERIT_ARRAY[:, genes[:, mothers[i]], genes[:, fathers[i]]].T
+            if known[i]:
+                probabilities = probabilities * TRAIT_ARRAY[:, traits[i]]
+                evidence = probabilities.sum(axis=1, keepdims=True)
+                probabilities = probabilities / evidence
+                log_weights += np.log(evidence[:, 0])
+            genes[:, i] = draw(probabilities, rng)
+
+        # Expected trait of each person given the sampled genes
+        trait = np.where(known, traits, TRAIT_ARRAY[genes, 1])
+        scale = log_weights.max()
+        w = np.exp(log_weights - scale)
+        w2 = w * w
+        batch = {
+            "scale": scale,
+            "w": w.sum(),
+            "w2": w2.sum(),
+            "gene": np.stack([w @ (genes == g) for g in GENES], axis=1),
+            "gene2": np.stack([w2 @ (genes == g) for g in GENES], axis=1),
+            "trait": w @ trait,
+            "trait2": w2 @ trait,
+            "trait22": w2 @ (trait * trait),
+        }
+        sums = batch if sums is None else merge_weights([sums, batch])
+        drawn += size
+    return sums
+
+
+def merge_weights(results):
+    """
+    Combine likelihood-weighting sums computed at different scales.
+    """
+    scale = max(result["scale"] for result in results)
+    merged = {"scale": scale}
+    for key in results[0]:
+        if key == "scale":
+            continue
+        power = 2 if key.endswith("2") else 1
+        merged[key] = sum(
+            result[key] * np.exp(power * (result["scale"] - scale))
+            for result in results
+        )
+    return merged
+
+
+def weighting_estimates(sums):
+    """
+    Return (gene, gene_error, trait, trait_error) from likelihood-weighting
+    sums: the self-normalized estimates and their delta-method standard errors.
+    """
+    gene = sums["gene"] / sums["w"]
+    trait = sums["trait"] / sums["w"]
+
+    # sum of w^2 (x - mean)^2 for indicators, where x^2 = x
+    gene_spread = sums["gene2"] - 2 * gene * sums["gene2"] + gene * gene * sums["w2"]
+    trait_spread = sums["trait22"] - 2 * trait * sums["trait2"] + trait * trait * sums["w2"]
+    gene_error = np.sqrt(np.maximum(gene_spread, 0)) / sums["w"]
+    trait_error = np.sqrt(np.maximum(trait_spread, 0)) / sums["w"]
+    return gene, gene_error, trait, trait_error
+
+
+def gibbs_sampling(mothers, fathers, traits, order, samples, deadline, rng):
+    """
+    Run GIBBS_CHAINS independent Gibbs chains side by side for up to
+    `samples` samples in total, resampling each person's genes in turn
+    from their distribution given everyone else's.
+
+    Each chain discards its first BURN_IN fraction of sweeps (or of the
+    time left before `deadline`, if that comes first) and averages the
+    conditional distributions it samples from over the rest. Returns
+    each chain's averages, so chains can be compared for error bars.
+    """
+    n = len(mothers)
+    chains = GIBBS_CHAINS
+    sweeps = max(2, -(-samples // chains))
+    burn_in = max(1, int(sweeps * BURN_IN))
+    burn_until = None
+    if deadline is not None:
+        now = time.perf_counter()
+        burn_until = now + BURN_IN * max(0.0, deadline - now)
+    order = order.tolist()
+    children = [[] for _ in range(n)]
+    for child in range(n):
+        if mothers[child] >= 0:
+            children[mothers[child]].append((child, True))
+            children[fathers[child]].append((child, False))
+
+    # Start every chain from a sample of the prior, which is never impossible
+    genes = np.empty((chains, n), dtype=np.int64)
+    for i in order:
+        if mothers[i] < 0:
+            probabilities = np.broadcast_to(PRIOR_ARRAY, (chains, len(GENES)))
+        else:
+            probabilities = INHERIT_ARRAY[:, genes[:, mothers[i]], genes[:, fathers[i]]].T
+        genes[:, i] = draw(probabilities, rng)
+
+    gene_sums = np.zeros((chains, n, len(GENES)))
+    kept = 0
+    for sweep in range(sweeps):
+        if deadline is not None:
+            now = time.perf_counter()
+            if kept and now >= deadline:
+                break
+            if not kept and sweep < burn_in and now >= burn_until:
+                burn_in = sweep
+        for i in order:
+            if mothers[i] < 0:
+                weights = np.tile(PRIOR_ARRAY, (chains, 1))
+            else:
+                weights = INHERIT_ARRAY[:, genes[:, mothers[i]], genes[:, fathers[i]]].T.copy()
+            if traits[i] >= 0:
+                weights *= TRAIT_ARRAY[:, traits[i]]
+            for child, is_mother in children[i]:
+                if is_mother:
+                    weights *= INHERIT_ARRAY[genes[:, child], :, genes[:, fathers[child]]]
+                else:
+                    weights *= INHERIT_ARRAY[genes[:, child], genes[:, mothers[child]], :]
+            weights /= weights.sum(axis=1, keepdims=True)
+            if sweep >= burn_in:
+                gene_sums[:, i] += weights
+            genes[:, i] = draw(weights, rng)
+        if sweep >= burn_in:
+            kept += 1
+
+    gene = gene_sums / max(kept, 1)
+    trait = np.where(traits >= 0, traits, gene @ TRAIT_ARRAY[:, 1])
+    return gene, trait
+
+
+def chain_estimates(results):
+    """
+    Return (gene, gene_error, trait, trait_error) from the per-chain
+    averages of every worker: the mean over chains and its standard error.
+    """
+    gene = np.concatenate([result[0] for result in results])
+    trait = np.concatenate([result[1] for result in results])
+    chains = len(gene)
+    if chains < 2:
+        return gene[0], np.zeros_like(gene[0]), trait[0], np.zeros_like(trait[0])
+    return (
+        gene.mean(axis=0), gene.std(axis=0, ddof=1) / np.sqrt(chains),
+        trait.mean(axis=0), trait.std(axis=0, ddof=1) / np.sqrt(chains),
+    )
+
+
+GENES = (0, 1, 2)
+INHERIT = inheritance_table()
+INHERIT_ARRAY = np.array([
+    [[INHERIT[mother][father][child] for father in GENES] for mother in GENES]
+    for child in GENES
+])
+PRIOR_ARRAY = np.array([PROBS["gene"][g] for g in GENES])
+TRAIT_ARRAY = np.array([[PROBS["trait"][g][False], PROBS["trait"][g][True]] for g in GENES])
+
+# Trait column values in a CSV, and the code a Pedigree stores for each
+TRAIT_CODES = {"": -1, "0": 0, "1": 1}
+
+# Assignments evaluated at once by vectorized_probabilities
+BLOCK_SIZE = 1 << 16
+
+METHODS = {
+    "eliminate": eliminate_probabilities,
+    "enumerate": enumerated_marginals,
+    "vectorize": vectorized_probabilities,
+}
+
+# Approximate methods, run by sample_probabilities
+SAMPLERS = ("weighting", "gibbs")
+
+# Default number of samples, and seconds allowed (None for no limit)
+SAMPLES = 100000
+SAMPLE_TIME = None
+
+# Assignments drawn at once by likelihood weighting, and the effective
+# sample size (for the spread of its weights) below which it warns
+SAMPLE_BATCH = 1 << 12
+MIN_EFFECTIVE = 100
+
+# Gibbs chains run side by side in each worker, and the fraction of each
+# chain's sweeps discarded before it is averaged
+GIBBS_CHAINS = 16
+BURN_IN = 0.1
 
 
 if __name__ == "__main__":
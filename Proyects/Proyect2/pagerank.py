@@ -1,17 +1,63 @@
+import mmap
+import multiprocessing
 import os
-import random
 import re
 import sys
+from array import array
+from concurrent.futures import ThreadPoolExecutor
 import numpy as np
 
 DAMPING = 0.85
 SAMPLES = 10000
 
+# iterate_pagerank stops once the ranks change by less than this in total
+TOLERANCE = 1e-10
+
+# Most updates iterate_pagerank makes before giving up on convergence, which
+# never comes with a damping factor of 1 on a periodic link structure
+MAX_ITERATIONS = 100000
+
+# Steps of the chain random_surf walks at once
+SURF_BLOCK = 1 << 20
+
+# Fewest runs between jumps random_surf walks side by side
+SURF_RUNS = 32
+
+# parallel_pagerank: steps allowed, surfers, steps per surfer per round,
+# and how many top pages must keep their order for how many rounds
+PARALLEL_SAMPLES = 10 ** 7
+WALKERS = 16
+ROUND_STEPS = 1 << 16
+TOP_PAGES = 10
+STABLE_ROUNDS = 3
+
+# Standard errors apart two pages' ranks must be to count as different
+TIE_ERRORS = 3
+
+# crawl_graph: threads reading pages, pages handed to them at a time,
+# bytes read from a file at a time, and the most of a chunk kept to
+# finish a link cut off at its end
+CRAWL_THREADS = 8
+CRAWL_BATCH = 1024
+CRAWL_CHUNK = 1 << 16
+CRAWL_TAIL = 1 << 12
+
+LINK_PATTERN = re.compile(rb"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Link graph cache kept in a corpus directory by main, its format
+# version, and the arrays it holds, in order
+CACHE_NAME = ".pagerank-cache"
+CACHE_VERSION = 1
+CACHE_FIELDS = (
+    "version", "page_names", "page_offsets", "sizes", "mtimes",
+    "indptr", "indices", "link_sources", "link_names", "link_offsets",
+)
+
 
 def main():
     if len(sys.argv) != 2:
         sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
+    corpus = crawl_graph(sys.argv[1], cache=os.path.join(sys.argv[1], CACHE_NAME))
     ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
@@ -19,34 +65,286 @@ def main():
     ranks = iterate_pagerank(corpus, DAMPING)
     print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
-        print(f"  {page}: {ranks}")
+        print(f"  {page}: {ranks[page]:.4f}")
+    ranks, errors, samples = parallel_pagerank(corpus, DAMPING, PARALLEL_SAMPLES)
+    print(f"PageRank Results from Parallel Sampling (n = {samples})")
+    for page in sorted(ranks):
+        print(f"  {page}: {ranks[page]:.4f} ± {errors[page]:.4f}")
 
 
-def crawl(directory):
+def crawl(directory, cache=None):
     """
     Parse a directory of HTML pages and check for links to other pages.
     Return a dictionary where each key is a page, and values are
     a list of all other pages in the corpus that are linked to by the page.
+    If `cache` is a path, the link graph is cached there (see crawl_graph).
     """
-    pages = dict()
-
-    # Extract all links from HTML files
-    for filename in os.listdir(directory):
-        if not filename.endswith(".html"):
-            continue
-        with open(os.path.join(directory, filename)) as f:
-            contents = f.read()
-            links = re.findall(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"", contents)
-            pages[filename] = set(links) - {filename}
-
-    # Only include links to other pages in the corpus
-    for filename in pages:
-        pages[filename] = set(
-            link for link in pages[filename]
-            if link in pages
-        )
+    graph = crawl_graph(directory, cache=cache)
+    return {
+        page: {graph.pages[link] for link in graph.indices[graph.indptr[i]:graph.indptr[i + 1]].tolist()}
+        for i, page in enumerate(graph.pages)
+    }
+
+
+def crawl_graph(directory, threads=CRAWL_THREADS, cache=None):
+    """
+    Parse a directory of HTML pages into the LinkGraph of its links to
+    other pages in the directory, numbering pages in sorted order.
+
+    If `cache` is a path, the graph is saved there and later calls reuse
+    it: only pages whose size or modification time changed are read
+    again, and if none did, no page is read and the graph's arrays are
+    memory-mapped straight from the cache.
+    """
+    if cache is not None:
+        return cached_graph(directory, cache, threads)
+    pages = sorted(name for name in os.listdir(directory) if name.endswith(".html"))
+    sources, targets = crawl_edges(directory, pages, threads)
+    return edge_graph(pages, sources, targets)
+
+
+def crawl_edges(directory, pages, threads=CRAWL_THREADS, only=None, unresolved=None):
+    """
+    Return (sources, targets) arrays listing every link from one of
+    `pages` in `directory` (or from the page numbers in `only`) to
+    another, as page numbers into `pages`. If `unresolved` is a list,
+    a (source, link) pair is added to it for each distinct link to a name
+    that is not one of `pages`.
+
+    Batches of CRAWL_BATCH pages are read by a pool of threads, each page
+    in chunks of CRAWL_CHUNK bytes so large files are never held whole;
+    links go straight into compact arrays as they are found.
+    """
+    number = {os.fsencode(page): i for i, page in enumerate(pages)}
+    code = "i" if len(pages) < 2 ** 31 else "q"
+    only = range(len(pages)) if only is None else only
+
+    def read(batch):
+        sources = array(code)
+        targets = array(code)
+        unknown = []
+        for source in batch:
+            links, others = page_links(os.path.join(directory, pages[source]), number, source)
+            sources.extend([source] * len(links))
+            targets.extend(links)
+            if unresolved is not None:
+                unknown.extend((source, link) for link in others)
+        return sources, targets, unknown
+
+    batches = [only[start:start + CRAWL_BATCH] for start in range(0, len(only), CRAWL_BATCH)]
+    sources = array(code)
+    targets = array(code)
+    with ThreadPoolExecutor(threads) as pool:
+        for batch_sources, batch_targets, unknown in pool.map(read, batches):
+            sources.extend(batch_sources)
+            targets.extend(batch_targets)
+            if unresolved is not None:
+                unresolved.extend(unknown)
+    dtype = index_type(len(pages))
+    return np.frombuffer(sources, dtype=dtype), np.frombuffer(targets, dtype=dtype)
+
+
+def page_links(path, number, source):
+    """
+    Return (links, others) for the HTML file at `path`: the sorted page
+    numbers, other than `source`, that it links to, where `number` maps
+    page names (as bytes) to numbers, and the set of other names it links to.
+
+    The file is searched a chunk at a time; up to CRAWL_TAIL bytes after
+    the last link found are carried into the next chunk so a link split
+    between chunks is still found.
+    """
+    # Unbuffered reads: a buffered file object costs more than reading
+    # most pages takes
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        text = os.read(fd, CRAWL_CHUNK)
+        if len(text) < CRAWL_CHUNK:
+            # The whole file fit in one chunk
+            links = LINK_PATTERN.findall(text)
+        else:
+            links = []
+            while text:
+                end = 0
+                for match in LINK_PATTERN.finditer(text):
+                    links.append(match.group(1))
+                    end = match.end()
+                chunk = os.read(fd, CRAWL_CHUNK)
+                text = text[max(end, len(text) - CRAWL_TAIL):] + chunk if chunk else b""
+    finally:
+        os.close(fd)
+    found = set()
+    others = set()
+    for link in set(links):
+        page = number.get(link)
+        if page is None:
+            others.add(link)
+        elif page != source:
+            found.add(page)
+    return sorted(found), others
+
+
+def cached_graph(directory, cache, threads=CRAWL_THREADS):
+    """
+    Return crawl_graph(directory), reusing the graph saved at `cache` by
+    an earlier call for pages whose size and modification time have not
+    changed, and saving the result back to `cache`.
+
+    The cache also keeps each page's links to names outside the corpus,
+    so a page added since is linked from unchanged pages without them
+    being read again, and links to a page since removed are kept for if
+    it comes back.
+    """
+    pages, sizes, mtimes = corpus_listing(directory)
+    names = [os.fsencode(page) for page in pages]
+    page_names, page_offsets = pack_names(names)
+    old = load_cache(cache)
+    if (old is not None
+            and np.array_equal(old["page_offsets"], page_offsets)
+            and np.array_equal(old["page_names"], page_names)
+            and np.array_equal(old["sizes"], sizes)
+            and np.array_equal(old["mtimes"], mtimes)):
+        return LinkGraph(pages, old["indptr"], old["indices"])
+
+    number = {name: i for i, name in enumerate(names)}
+    reused = np.zeros(len(pages), dtype=bool)
+    sources = []
+    targets = []
+    unresolved = []
+    if old is not None:
+        old_names = unpack_names(old["page_names"], old["page_offsets"])
+        renumber = np.array([number.get(name, -1) for name in old_names], dtype=np.int64)
+        same = renumber >= 0
+        same[same] = ((old["sizes"][same] == sizes[renumber[same]])
+                      & (old["mtimes"][same] == mtimes[renumber[same]]))
+        reused[renumber[same]] = True
+
+        # Links from unchanged pages, except to pages since removed
+        old_sources = np.repeat(np.arange(len(old_names)), np.diff(old["indptr"]))
+        old_targets = np.asarray(old["indices"])[same[old_sources]]
+        old_sources = old_sources[same[old_sources]]
+        kept = renumber[old_targets] >= 0
+        sources.append(renumber[old_sources[kept]])
+        targets.append(renumber[old_targets[kept]])
+        unresolved.extend(zip(
+            renumber[old_sources[~kept]].tolist(),
+            (old_names[target] for target in old_targets[~kept].tolist()),
+        ))
+
+        # Links from unchanged pages to names that may now be pages
+        for source, link in zip(old["link_sources"].tolist(),
+                                unpack_names(old["link_names"], old["link_offsets"])):
+            if same[source]:
+                target = number.get(link)
+                if target is None:
+                    unresolved.append((int(renumber[source]), link))
+                else:
+                    sources.append([renumber[source]])
+                    targets.append([target])
+
+    read_sources, read_targets = crawl_edges(
+        directory, pages, threads, np.flatnonzero(~reused).tolist(), unresolved
+    )
+    dtype = index_type(len(pages))
+    graph = edge_graph(
+        pages,
+        np.concatenate(sources + [read_sources]).astype(dtype),
+        np.concatenate(targets + [read_targets]).astype(dtype),
+    )
+    link_names, link_offsets = pack_names([link for _, link in unresolved])
+    save_cache(cache, {
+        "version": np.array([CACHE_VERSION]),
+        "page_names": page_names,
+        "page_offsets": page_offsets,
+        "sizes": sizes,
+        "mtimes": mtimes,
+        "indptr": graph.indptr,
+        "indices": graph.indices,
+        "link_sources": np.array([source for source, _ in unresolved], dtype=np.int64),
+        "link_names": link_names,
+        "link_offsets": link_offsets,
+    })
+    return graph
+
+
+def corpus_listing(directory):
+    """
+    Return (pages, sizes, mtimes): the sorted names of the HTML pages in
+    `directory`, and arrays of their sizes and modification times (ns).
+    """
+    entries = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".html")),
+        key=lambda entry: entry.name,
+    )
+    stats = [entry.stat() for entry in entries]
+    return (
+        [entry.name for entry in entries],
+        np.array([stat.st_size for stat in stats], dtype=np.int64),
+        np.array([stat.st_mtime_ns for stat in stats], dtype=np.int64),
+    )
+
+
+def pack_names(names):
+    """
+    Return (data, offsets) arrays holding a list of byte strings: name i
+    is data[offsets[i]:offsets[i + 1]].
+    """
+    offsets = np.zeros(len(names) + 1, dtype=np.int64)
+    np.cumsum([len(name) for name in names], out=offsets[1:])
+    return np.frombuffer(b"".join(names), dtype=np.uint8), offsets
+
+
+def unpack_names(data, offsets):
+    """
+    Return the list of byte strings packed by pack_names.
+    """
+    data = data.tobytes()
+    offsets = offsets.tolist()
+    return [data[start:end] for start, end in zip(offsets, offsets[1:])]
+
+
+def save_cache(path, arrays):
+    """
+    Write the CACHE_FIELDS of `arrays` to `path` as consecutive .npy
+    records, replacing any cache there only once the new one is complete.
+    A cache that cannot be written is skipped.
+    """
+    temporary = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(temporary, "wb") as f:
+            for field in CACHE_FIELDS:
+                np.lib.format.write_array(f, np.ascontiguousarray(arrays[field]), allow_pickle=False)
+        os.replace(temporary, path)
+    except OSError:
+        if os.path.exists(temporary):
+            os.remove(temporary)
+
+
+def load_cache(path):
+    """
+    Return the arrays saved by save_cache at `path` as a dict, each one
+    memory-mapped from the file rather than read, or None if there is no
+    usable cache there.
+    """
+    arrays = dict()
+    try:
+        with open(path, "rb") as f:
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            for field in CACHE_FIELDS:
+                major, _ = np.lib.format.read_magic(f)
+                if major == 1:
+                    shape, fortran, dtype = np.lib.format.read_array_header_1_0(f)
+                else:
+                    shape, fortran, dtype = np.lib.format.read_array_header_2_0(f)
+                arrays[field] = np.ndarray(shape, dtype, buffer=buffer, offset=f.tell(),
+                                           order="F" if fortran else "C")
+                f.seek(arrays[field].nbytes, os.SEEK_CUR)
+    except (OSError, ValueError, TypeError):
+        return None
+    if arrays["version"].tolist() != [CACHE_VERSION]:
+        return None
+    return arrays
 
-    return pages
 
     #an be described as the probability that a random surfer is on that page at any given time
     #One way to interpret this model is as a Markov Chain, where each page represents a state
@@ -65,57 +363,209 @@ def transition_model(corpus, page, damping_factor):
     linked to by `page`. With probability `1 - damping_factor`, choose
     a link at random chosen from all pages in the corpus.
     """
-    
-    n = len(corpus.keys())
-    random_prob = (1) / n
+    n = len(corpus)
+    probabilities = {p: (1 - damping_factor) / n for p in corpus}
 
-    probabilities = {p: random_prob for p in corpus}
-    if corpus[page]:
-        probab = damping_factor / len(corpus)
-        for probab in corpus[page]:
-            probabilities[probab] += random_prob
-        
-        else:
-            for p in probabilities:
-                probabilities[p] += damping_factor / (n - 1) 
+    # A page without links is treated as linking to every page
+    links = corpus[page] or corpus
+    for link in links:
+        probabilities[link] += damping_factor / len(links)
     return probabilities
 
 
-def sample_pagerank(corpus, damping_factor, n):
-    
-    #creemos samples
-    visit_counts = {page: 0 for page in corpus}
-    current_page = random.choice(list(corpus.keys()))
-    
-    
-    
-    for _ in range(n):
-        transitional = transition_model(corpus, current_page, damping_factor)
-        
-        nextpage = random.choices(
-            list(transitional.keys()),
-            weights=(list(transitional.values())),
-            k=n
-        )[0]
-        
-        current_page = nextpage
-        visit_counts[current_page] += 1
-        
-        pagerank = {page: count / (n - 1) for page, count in visit_counts.items()}
-        
-        
-    return pagerank
-        
+def sample_pagerank(corpus, damping_factor, n, seed=None):
     """
     Return PageRank values for each page by sampling `n` pages
     according to transition model, starting with a page at random.
 
-    Return a dictionary where keys are page names
+    Return a dictionary where keys are page names, and values are
+    their estimated PageRank value (a value between 0 and 1). All
+    PageRank values should sum to 1.
+    """
+    graph = link_graph(corpus)
+    counts, _ = random_surf(graph, damping_factor, n, np.random.default_rng(seed))
+    return dict(zip(graph.pages, (counts / max(n, 1)).tolist()))
+
+
+def random_surf(graph, damping_factor, n, rng, page=None):
+    """
+    Return (counts, page): how many of `n` pages visited by a random
+    surfer on `graph` landed on each page, and the page it ended on.
+    The surfer starts on a random page, counted as its first visit, or
+    carries on from `page` if one is given.
+
+    Every step of transition_model picks either one of the current page's
+    links or any page, each uniformly, so one random number u picks the
+    next page directly: u below `damping_factor` is scaled onto the
+    page's links (all pages, for a page without links), the rest onto
+    the whole corpus.
+
+    A jump to a random page does not depend on where the surfer was, so
+    the runs of steps between jumps are walked side by side: the first
+    step of every run, then the second step of every run still going,
+    and so on, SURF_BLOCK steps of the chain at a time. Once fewer than
+    SURF_RUNS runs are left (with a damping factor near 1 there may be
+    only one), their remaining steps are taken one by one.
     """
+    pages = len(graph)
+    counts = np.zeros(pages, dtype=np.int64)
+    if n <= 0 or pages == 0:
+        return counts, page
 
+    # Pages without links get the slice of `targets` holding every page
+    dangling = graph.degrees == 0
+    targets = np.concatenate([graph.indices, np.arange(pages, dtype=graph.indices.dtype)])
+    first = np.where(dangling, len(graph.indices), graph.indptr[:-1])
+    degrees = np.where(dangling, pages, graph.degrees)
+    last = degrees - 1
+    scale = degrees / damping_factor if damping_factor > 0 else degrees.astype(float)
+    jump_scale = pages / (1 - damping_factor) if damping_factor < 1 else 0
+
+    def follow(current, u):
+        # Next pages from `current` for draws u below damping_factor
+        chosen = np.minimum((u * scale[current]).astype(np.int64), last[current])
+        return targets[first[current] + chosen]
+
+    if page is None:
+        page = int(rng.integers(pages))
+        counts[page] += 1
+        n -= 1
+    page = np.array([page])
+    lists = None
+    for start in range(0, n, SURF_BLOCK):
+        u = rng.random(min(SURF_BLOCK, n - start))
+        visits = np.empty(len(u), dtype=np.int64)
+        jumps = u >= damping_factor
+        visits[jumps] = np.minimum(
+            ((u[jumps] - damping_factor) * jump_scale).astype(np.int64), pages - 1
+        )
+        if not jumps[0]:
+            visits[0] = follow(page, u[:1])[0]
+
+        # Runs start at the block's first step and at every jump, longest first
+        runs = np.flatnonzero(jumps)
+        runs = np.concatenate([[0], runs[runs > 0]])
+        lengths = np.diff(np.append(runs, len(u)))
+        # (run lengths almost always fit 16 bits, which numpy sorts by radix)
+        key = -lengths.astype(np.int16) if lengths.max() < 2 ** 15 else -lengths
+        longest = np.argsort(key, kind="stable")
+        runs = runs[longest]
+        lengths = lengths[longest]
+        going = np.searchsorted(-lengths, -np.arange(lengths[0] + 1), side="left")
+        step = 1
+        while step < lengths[0] and going[step] >= SURF_RUNS:
+            here = runs[:going[step]] + step
+            visits[here] = follow(visits[here - 1], u[here])
+            step += 1
+
+        tails = int(going[step]) if step < lengths[0] else 0
+        if tails and lists is None:
+            lists = (targets.tolist(), first.tolist(), scale.tolist(), last.tolist())
+        for run, length in zip(runs[:tails].tolist(), lengths[:tails].tolist()):
+            to, at, by, upto = lists
+            current = int(visits[run + step - 1])
+            tail = []
+            for draw in u[run + step:run + length].tolist():
+                current = to[at[current] + min(int(draw * by[current]), upto[current])]
+                tail.append(current)
+            visits[run + step:run + length] = tail
+        counts += np.bincount(visits, minlength=pages)
+        page = visits[-1:]
+    return counts, int(page[0])
+
+
+def parallel_pagerank(corpus, damping_factor, n, walkers=WALKERS, processes=None, seed=None):
+    """
+    Estimate PageRank with `walkers` independent random surfers, each
+    with its own random number stream, spread over a process pool.
+
+    Surfers take ROUND_STEPS steps each per round, and each surfer's
+    visit frequencies in a round count as one estimate of the PageRank,
+    so their spread gives a standard error for every page. Rounds stop
+    after `n` steps in total, or once the TOP_PAGES highest ranked pages
+    have come out in the same order for STABLE_ROUNDS rounds in a row
+    (see top_ranking for how ties are treated).
+
+    Return (ranks, errors, steps): PageRank values as iterate_pagerank
+    returns them, the standard error of each, and the steps taken.
+    """
+    graph = link_graph(corpus)
+    pages = len(graph)
+    walkers = max(2, walkers)
+    streams = np.random.SeedSequence(seed).spawn(walkers)
+    surfers = [(None, np.random.default_rng(stream)) for stream in streams]
+    total = np.zeros(pages)
+    squares = np.zeros(pages)
+    batches = 0
+    steps = 0
+    top = None
+    stable = 0
+
+    with multiprocessing.Pool(processes, initializer=start_surfer,
+                              initargs=(graph, damping_factor)) as pool:
+        while steps < n and stable < STABLE_ROUNDS:
+            length = max(1, min(ROUND_STEPS, (n - steps) // walkers))
+            results = pool.map(surf_round, [(length, page, rng) for page, rng in surfers])
+            surfers = []
+            for counts, page, rng in results:
+                frequencies = counts / length
+                total += frequencies
+                squares += frequencies * frequencies
+                surfers.append((page, rng))
+            batches += walkers
+            steps += walkers * length
+
+            ranks = total / batches
+            variance = np.maximum(squares / batches - ranks * ranks, 0) * batches / (batches - 1)
+            errors = np.sqrt(variance / batches)
+            ranking = top_ranking(ranks, errors)
+            stable = stable + 1 if ranking == top else 0
+            top = ranking
+
+    return (dict(zip(graph.pages, ranks.tolist())),
+            dict(zip(graph.pages, errors.tolist())), steps)
+
+
+def top_ranking(ranks, errors):
+    """
+    Return the TOP_PAGES highest ranked page numbers as a tuple of sets,
+    best first. Pages next to each other in the ranking whose ranks are
+    within TIE_ERRORS standard errors share a set, so pages with equal
+    PageRank do not keep the ranking from settling.
+    """
+    order = np.argsort(-ranks, kind="stable")[:TOP_PAGES + 1].tolist()
+    groups = [[order[0]]] if order else []
+    for better, worse in zip(order, order[1:]):
+        if ranks[better] - ranks[worse] <= TIE_ERRORS * np.hypot(errors[better], errors[worse]):
+            groups[-1].append(worse)
+        elif sum(map(len, groups)) >= TOP_PAGES:
+            break
+        else:
+            groups.append([worse])
+    return tuple(frozenset(group) for group in groups)
+
+
+def start_surfer(graph, damping_factor):
+    """
+    Keep the link graph in each worker process, so it is sent once per
+    process rather than once per round.
+    """
+    global surfer_graph, surfer_damping
+    surfer_graph = graph
+    surfer_damping = damping_factor
 
 
-def iterate_pagerank(corpus, damping_factor):
+def surf_round(job):
+    """
+    Carry one surfer on for a round in a worker process, returning its
+    visit counts, the page it stopped on and its random number generator.
+    """
+    length, page, rng = job
+    counts, page = random_surf(surfer_graph, surfer_damping, length, rng, page)
+    return counts, page, rng
+
+
+def iterate_pagerank(corpus, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
     """
     Return PageRank values for each page by iteratively updating
     PageRank values until convergence.
@@ -124,23 +574,101 @@ def iterate_pagerank(corpus, damping_factor):
     their estimated PageRank value (a value between 0 and 1). All
     PageRank values should sum to 1.
     """
-    
-    #Each page i that links to p has its own PageRank, 
-    # PR(i)  representing the probability that we are on page i at any given time.
-    
-    N = len(corpus)
-    data = []
-    for pages, links in corpus.items():
-        if links in corpus.values():
-            num_links = int(len(links))
-            m =  num_links
-    Pri = np.ones(N) / N
-    for _ in range(100):
-        Pr = (1 - damping_factor) / N + damping_factor * (Pri / m)
-        
-    return Pr
-    
-  
+    graph = link_graph(corpus)
+    ranks = power_iteration(graph, damping_factor, tolerance, max_iterations)
+    return dict(zip(graph.pages, ranks.tolist()))
+
+
+class LinkGraph():
+    """
+    Links between the pages of a corpus in compressed sparse row form:
+    page number i links to the page numbers indices[indptr[i]:indptr[i + 1]],
+    and pages[i] is its name.
+    """
+
+    def __init__(self, pages, indptr, indices):
+        self.pages = pages
+        self.indptr = indptr
+        self.indices = indices
+        self.degrees = np.diff(indptr)
+
+    def __len__(self):
+        return len(self.pages)
+
+
+def link_graph(corpus):
+    """
+    Return the LinkGraph of a corpus as returned by crawl(), numbering
+    the pages in sorted order. A LinkGraph is returned as it is.
+    """
+    if isinstance(corpus, LinkGraph):
+        return corpus
+    pages = sorted(corpus)
+    number = {page: i for i, page in enumerate(pages)}
+    degrees = np.fromiter((len(corpus[page]) for page in pages), dtype=np.int64, count=len(pages))
+    indptr = np.zeros(len(pages) + 1, dtype=np.int64)
+    np.cumsum(degrees, out=indptr[1:])
+    indices = np.fromiter(
+        (number[link] for page in pages for link in sorted(corpus[page])),
+        dtype=index_type(len(pages)), count=int(indptr[-1])
+    )
+    return LinkGraph(pages, indptr, indices)
+
+
+def edge_graph(pages, sources, targets):
+    """
+    Return the LinkGraph of `pages` with a link from page number
+    sources[i] to page number targets[i] for every i.
+    """
+    order = np.lexsort((targets, sources))
+    indptr = np.zeros(len(pages) + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=len(pages)), out=indptr[1:])
+    return LinkGraph(pages, indptr, targets[order])
+
+
+def index_type(n):
+    """
+    Return the smallest integer type that can number `n` pages.
+    """
+    return np.int32 if n < 2 ** 31 else np.int64
+
+
+def power_iteration(graph, damping_factor, tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS):
+    """
+    Return an array of PageRank values for the pages of `graph`, updating
+    every page's rank from its incoming links until the ranks change by
+    less than `tolerance` in total, or with a warning after `max_iterations`
+    updates.
+
+    A page without links is treated as linking to every page, itself
+    included, so the rank it passes on is spread evenly over the corpus.
+    """
+    if not 0 <= damping_factor <= 1:
+        raise ValueError(f"damping factor must be between 0 and 1, got {damping_factor}")
+    n = len(graph)
+    if n == 0:
+        return np.zeros(0)
+    degrees = graph.degrees
+    dangling = degrees == 0
+    inverse = np.zeros(n)
+    inverse[~dangling] = 1 / degrees[~dangling]
+
+    ranks = np.full(n, 1 / n)
+    for _ in range(max_iterations):
+        # Each page passes rank / degree along every one of its links
+        passed = np.bincount(graph.indices, weights=np.repeat(ranks * inverse, degrees), minlength=n)
+        spread = (1 - damping_factor + damping_factor * ranks[dangling].sum()) / n
+        updated = spread + damping_factor * passed
+        change = np.abs(updated - ranks).sum()
+        ranks = updated
+        if change < tolerance:
+            return ranks / ranks.sum()
+    print(f"Warning: PageRank did not converge in {max_iterations} iterations "
+          f"(last change {change:.2g}); try a damping factor below 1",
+          file=sys.stderr)
+    return ranks / ranks.sum()
+
+
 if __name__ == "__main__":
     main()
 